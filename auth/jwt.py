@@ -3,15 +3,16 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Importaciones
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database import get_db
+from database import AsyncSessionLocal, get_async_db
 from models.schemas import TokenData
-from crud.users import get_user_by_email
+from crud.users import get_user_by_email_async
+from auth.principal_cache import AuthenticatedUser, principal_cache
 
 # Configuración para JWT
 SECRET_KEY = "clave_secreta_cambiar_en_produccion"
@@ -30,7 +31,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciales inválidas",
@@ -45,7 +46,23 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_email(db, email=token_data.email)
-    if user is None:
+    # Consultar primero la caché para evitar un acceso a la base de datos por petición
+    user = principal_cache.get(token_data.email)
+    if user is not None:
+        return user
+
+    db_user = await get_user_by_email_async(db, email=token_data.email)
+    if db_user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    # La caché y los endpoints reciben la misma copia, independiente de la sesión
+    user = AuthenticatedUser.from_user(db_user)
+    principal_cache.set(token_data.email, user)
+    return user
+
+async def get_current_user_detached(token: str = Depends(oauth2_scheme)):
+    # Para respuestas de larga duración (SSE, exportación): FastAPI cierra las dependencias
+    # con yield cuando termina la respuesta, así que get_async_db retendría su conexión
+    # (y en SQLite una instantánea WAL) durante todo el envío. Esta sesión se cierra antes
+    # de que el endpoint devuelva la respuesta.
+    async with AsyncSessionLocal() as db:
+        return await get_current_user(token, db)
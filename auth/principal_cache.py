@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from typing import Optional
+import time
+
+from sqlalchemy import event, inspect
+
+# Importaciones
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.database_models import User
+
+# Configuración de la caché de usuarios autenticados
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+PRINCIPAL_CACHE_MAX_SIZE = 1024
+
+# Campos que, al cambiar, invalidan la entrada del usuario en caché
+INVALIDATING_FIELDS = ("email", "role", "departamento_id", "hashed_password")
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    # Copia inmutable de las columnas del usuario. La caché no guarda la instancia ORM:
+    # sigue ligada a la sesión de la petición que la cargó y un rollback en esa sesión
+    # la expiraría (DetachedInstanceError en las peticiones siguientes)
+    id: str
+    email: str
+    nombre_Usuario: str
+    nombre: str
+    extensión: Optional[str]
+    departamento_id: Optional[str]
+    role: str
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            nombre_Usuario=user.nombre_Usuario,
+            nombre=user.nombre,
+            extensión=user.extensión,
+            departamento_id=user.departamento_id,
+            role=user.role,
+            created_at=user.created_at,
+        )
+
+
+class PrincipalCache:
+    # Caché LRU con expiración por tiempo, indexada por el "sub" del token (email)
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_MAX_SIZE, ttl: float = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, subject: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return user
+
+    def set(self, subject: str, user):
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+principal_cache = PrincipalCache()
+
+
+# Invalidar la caché cuando cambian rol, departamento, email o contraseña de un usuario
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    state = inspect(target)
+    changed = False
+    for field in INVALIDATING_FIELDS:
+        history = state.attrs[field].history
+        if history.has_changes():
+            changed = True
+            if field == "email":
+                for old_email in history.deleted:
+                    principal_cache.invalidate(old_email)
+    if changed:
+        principal_cache.invalidate(target.email)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    principal_cache.invalidate(target.email)
@@ -1,6 +1,9 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.database_models import Attachment
 from models.schemas import AttachmentCreate
+from crud.policy import VIEW, Principal, attachment_predicate, check_access_async, restrict
 
 def get_attachment(db: Session, attachment_id: str):
     return db.query(Attachment).filter(Attachment.id == attachment_id).first()
@@ -13,7 +16,9 @@ def create_attachment(db: Session, attachment: AttachmentCreate):
         file_name=attachment.file_name,
         file_path=attachment.file_path,
         file_extension=attachment.file_extension,
-        ticket_id=attachment.ticket_id
+        ticket_id=attachment.ticket_id,
+        content_hash=attachment.content_hash,
+        file_size=attachment.file_size
     )
     db.add(db_attachment)
     db.commit()
@@ -26,3 +31,50 @@ def delete_attachment(db: Session, attachment_id: str):
         db.delete(db_attachment)
         db.commit()
     return db_attachment
+
+# Variantes asíncronas
+# Con principal, solo se devuelven adjuntos de tickets sobre los que la acción está permitida
+async def get_attachment_async(
+    db: AsyncSession,
+    attachment_id: str,
+    principal: Principal = None,
+    action: str = VIEW
+):
+    query = select(Attachment).where(Attachment.id == attachment_id)
+    result = await db.execute(restrict(query, attachment_predicate(principal, action)))
+    return result.scalars().first()
+
+async def check_attachment_access_async(db: AsyncSession, attachment_id: str, principal: Principal, action: str = VIEW):
+    return await check_access_async(db, Attachment, attachment_id, attachment_predicate(principal, action))
+
+async def get_attachments_by_ticket_async(db: AsyncSession, ticket_id: str, principal: Principal = None):
+    query = select(Attachment).where(Attachment.ticket_id == ticket_id)
+    result = await db.execute(restrict(query, attachment_predicate(principal, VIEW)))
+    return result.scalars().all()
+
+async def create_attachment_async(db: AsyncSession, attachment: AttachmentCreate):
+    db_attachment = Attachment(
+        file_name=attachment.file_name,
+        file_path=attachment.file_path,
+        file_extension=attachment.file_extension,
+        ticket_id=attachment.ticket_id,
+        content_hash=attachment.content_hash,
+        file_size=attachment.file_size
+    )
+    db.add(db_attachment)
+    # Todos los valores se generan en Python: no hace falta refresh tras el INSERT
+    await db.commit()
+    return db_attachment
+
+async def delete_attachment_async(db: AsyncSession, db_attachment: Attachment):
+    # Recibe el adjunto ya cargado por el endpoint: un único DELETE
+    await db.delete(db_attachment)
+    await db.commit()
+    return db_attachment
+
+async def count_attachments_by_hash_async(db: AsyncSession, content_hash: str):
+    # Referencias restantes a un blob del almacén direccionado por contenido
+    result = await db.execute(
+        select(func.count()).select_from(Attachment).where(Attachment.content_hash == content_hash)
+    )
+    return result.scalar_one()
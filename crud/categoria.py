@@ -1,6 +1,16 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from models.database_models import Categoria, CategoriaDepartamento
 from models.schemas import CategoriaCreate
+from crud.pagination import paginate
+from crud.errors import DuplicateEntry, is_unique_violation
+from crud.reference_cache import CATEGORIAS, CATEGORIA_DEPARTAMENTO, mark_reference_change
+
+# Categoria no tiene fecha de creación: el cursor usa la clave primaria
+CATEGORIA_CURSOR_FIELDS = ("id",)
 
 def get_categoria(db: Session, categoria_id: str):
     return db.query(Categoria).filter(Categoria.id == categoria_id).first()
@@ -8,8 +18,8 @@ def get_categoria(db: Session, categoria_id: str):
 def get_categoria_by_nombre(db: Session, nombre: str):
     return db.query(Categoria).filter(Categoria.nombre == nombre).first()
 
-def get_categorias(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Categoria).offset(skip).limit(limit).all()
+def get_categorias(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
+    return paginate(db.query(Categoria), [Categoria.id], skip, limit, cursor).all()
 
 def create_categoria(db: Session, categoria: CategoriaCreate):
     db_categoria = Categoria(nombre=categoria.nombre)
@@ -67,3 +77,93 @@ def get_departamentos_by_categoria(db: Session, categoria_id: str):
     if categoria:
         return categoria.departamentos
     return []
+
+# Variantes asíncronas
+async def get_categoria_async(db: AsyncSession, categoria_id: str):
+    result = await db.execute(select(Categoria).where(Categoria.id == categoria_id))
+    return result.scalars().first()
+
+async def get_categoria_by_nombre_async(db: AsyncSession, nombre: str):
+    result = await db.execute(select(Categoria).where(Categoria.nombre == nombre))
+    return result.scalars().first()
+
+async def get_categorias_async(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str = None):
+    result = await db.execute(paginate(select(Categoria), [Categoria.id], skip, limit, cursor))
+    return result.scalars().all()
+
+async def create_categoria_async(db: AsyncSession, categoria: CategoriaCreate):
+    # La restricción UNIQUE de nombre sustituye a la consulta previa
+    db_categoria = Categoria(nombre=categoria.nombre)
+    db.add(db_categoria)
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if is_unique_violation(exc):
+            raise DuplicateEntry()
+        raise
+    return db_categoria
+
+async def update_categoria_async(db: AsyncSession, categoria_id: str, nombre: str):
+    # Un único UPDATE ... RETURNING (OUTPUT en SQL Server); None si no existe
+    try:
+        result = await db.execute(
+            update(Categoria)
+            .where(Categoria.id == categoria_id)
+            .values(nombre=nombre)
+            .returning(Categoria)
+        )
+        db_categoria = result.scalars().first()
+        mark_reference_change(db, CATEGORIAS)
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if is_unique_violation(exc):
+            raise DuplicateEntry()
+        raise
+    return db_categoria
+
+async def delete_categoria_async(db: AsyncSession, db_categoria: Categoria):
+    # Recibe la categoría ya cargada por el endpoint; el ORM limpia sus relaciones
+    await db.delete(db_categoria)
+    await db.commit()
+    return db_categoria
+
+async def assign_categoria_to_departamento_async(db: AsyncSession, categoria_id: str, departamento_id: str):
+    # INSERT directo: la clave primaria compuesta detecta la asignación repetida
+    db.add(CategoriaDepartamento(
+        categoria_id=categoria_id,
+        departamento_id=departamento_id
+    ))
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if is_unique_violation(exc):
+            return False
+        raise
+    return True
+
+async def remove_categoria_from_departamento_async(db: AsyncSession, categoria_id: str, departamento_id: str):
+    result = await db.execute(
+        delete(CategoriaDepartamento).where(
+            CategoriaDepartamento.categoria_id == categoria_id,
+            CategoriaDepartamento.departamento_id == departamento_id
+        )
+    )
+    if result.rowcount:
+        mark_reference_change(db, CATEGORIA_DEPARTAMENTO)
+    await db.commit()
+    return result.rowcount > 0
+
+async def get_departamentos_by_categoria_async(db: AsyncSession, categoria_id: str):
+    # La relación se carga de antemano: en async no hay carga perezosa
+    result = await db.execute(
+        select(Categoria)
+        .options(selectinload(Categoria.departamentos))
+        .where(Categoria.id == categoria_id)
+    )
+    categoria = result.scalars().first()
+    if categoria:
+        return categoria.departamentos
+    return []
@@ -0,0 +1,200 @@
+# Feed de cambios en proceso (pub/sub) para tickets, comentarios, adjuntos y mensajes.
+# Las escrituras confirmadas se publican desde los eventos de sesión (after_flush recoge,
+# after_commit publica); los suscriptores SSE reciben solo lo que su rol puede ver y
+# pueden reanudar con Last-Event-ID mientras el evento siga en el búfer.
+import asyncio
+import uuid
+from collections import deque
+from threading import Lock
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from models.database_models import Attachment, Comment, Mensaje, Ticket
+from crud.policy import ADMINISTRADOR, SOPORTE, USUARIO
+
+CHANGE_FEED_BUFFER_SIZE = 2000
+SUBSCRIBER_QUEUE_SIZE = 500
+
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class Subscriber:
+
+    def __init__(self, user):
+        self.user_id = str(user.id)
+        self.role = user.role
+        self.departamento_id = user.departamento_id
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Se activa si el cliente no consume a tiempo; debe reconectar y reanudar
+        self.overflowed = False
+
+
+class ChangeFeedBroker:
+
+    def __init__(self, buffer_size: int = CHANGE_FEED_BUFFER_SIZE):
+        self._lock = Lock()
+        self._buffer = deque(maxlen=buffer_size)
+        self._sequence = 0
+        self._subscribers = set()
+        self._loop = None
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self, user) -> Subscriber:
+        subscriber = Subscriber(user)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, events):
+        # Puede llamarse desde cualquier hilo (sesiones síncronas en el threadpool)
+        with self._lock:
+            published = []
+            for data in events:
+                self._sequence += 1
+                item = (self._sequence, data)
+                self._buffer.append(item)
+                published.append(item)
+            self.published += len(published)
+            subscribers = list(self._subscribers)
+            loop = self._loop
+        if loop is None or not published or not subscribers:
+            return
+        for subscriber in subscribers:
+            loop.call_soon_threadsafe(self._deliver, subscriber, published)
+
+    def _deliver(self, subscriber: Subscriber, items):
+        if subscriber.overflowed:
+            return
+        for item in items:
+            try:
+                subscriber.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+                self.dropped_subscribers += 1
+                return
+
+    def replay_since(self, last_event_id: str):
+        # Devuelve (eventos pendientes, completo). completo=False si el id no es de este
+        # proceso o ya salió del búfer: el cliente debe recargar su estado.
+        boot_id, _, sequence_text = (last_event_id or "").partition(":")
+        if boot_id != _BOOT_ID or not sequence_text.isdigit():
+            return [], False
+        sequence = int(sequence_text)
+        with self._lock:
+            items = [item for item in self._buffer if item[0] > sequence]
+            oldest = self._buffer[0][0] if self._buffer else self._sequence + 1
+            complete = sequence >= oldest - 1
+        return items, complete
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "buffered": len(self._buffer),
+                "last_event_id": self.format_id(self._sequence),
+                "published": self.published,
+                "dropped_subscribers": self.dropped_subscribers,
+            }
+
+    @staticmethod
+    def format_id(sequence: int) -> str:
+        return f"{_BOOT_ID}:{sequence}"
+
+
+change_feed = ChangeFeedBroker()
+
+
+def can_see(subscriber: Subscriber, data: dict) -> bool:
+    # Reglas de VIEW de crud.policy, evaluadas sobre el evento en lugar de en SQL
+    if subscriber.role == ADMINISTRADOR:
+        return True
+    audience = data["audience"]
+    if "users_id" in audience:
+        return audience["users_id"] == subscriber.user_id
+    if subscriber.role == USUARIO:
+        return subscriber.user_id in audience["requested_by"]
+    if subscriber.role == SOPORTE:
+        return (
+            subscriber.departamento_id in audience["departamento_id"]
+            or subscriber.user_id in audience["assigned_to"]
+        )
+    return False
+
+
+# --- Recogida de cambios en la sesión ------------------------------------------
+
+def _values(state, attribute):
+    # Valores actual y anterior, para avisar también a quien deja de ver el ticket
+    history = state.attrs[attribute].history
+    values = set(history.unchanged) | set(history.added) | set(history.deleted)
+    return [str(value) for value in values if value is not None]
+
+def _ticket_audience(ticket):
+    state = inspect(ticket)
+    return {
+        "requested_by": _values(state, "user_id"),
+        "departamento_id": _values(state, "departamento_id"),
+        "assigned_to": _values(state, "assigned_to"),
+    }
+
+def ticket_audience_from_row(row):
+    return {
+        "requested_by": [str(row.user_id)] if row.user_id else [],
+        "departamento_id": [str(row.departamento_id)] if row.departamento_id else [],
+        "assigned_to": [str(row.assigned_to)] if row.assigned_to else [],
+    }
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    pending = session.info.setdefault("change_feed", [])
+    children = []
+    for action, objects in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for obj in objects:
+            if isinstance(obj, Ticket):
+                if action == "updated" and not session.is_modified(obj, include_collections=False):
+                    continue
+                pending.append({
+                    "type": f"ticket.{action}",
+                    "id": str(obj.id),
+                    "ticket_id": str(obj.id),
+                    "audience": _ticket_audience(obj),
+                })
+            elif isinstance(obj, (Comment, Attachment)):
+                kind = "comment" if isinstance(obj, Comment) else "attachment"
+                children.append({"type": f"{kind}.{action}", "id": str(obj.id), "ticket_id": str(obj.ticket_id)})
+            elif isinstance(obj, Mensaje):
+                pending.append({
+                    "type": f"mensaje.{action}",
+                    "id": str(obj.id),
+                    "audience": {"users_id": str(obj.users_id)},
+                })
+    if children:
+        # Comentarios y adjuntos heredan la visibilidad de su ticket
+        ticket_ids = {child["ticket_id"] for child in children}
+        rows = session.connection().execute(
+            select(Ticket.id, Ticket.user_id, Ticket.departamento_id, Ticket.assigned_to)
+            .where(Ticket.id.in_(ticket_ids))
+        )
+        audiences = {str(row.id): ticket_audience_from_row(row) for row in rows}
+        for child in children:
+            child["audience"] = audiences.get(
+                child["ticket_id"], {"requested_by": [], "departamento_id": [], "assigned_to": []}
+            )
+            pending.append(child)
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    events = session.info.pop("change_feed", None)
+    if events:
+        change_feed.publish(events)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("change_feed", None)
@@ -1,4 +1,6 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.database_models import Comment
 from models.schemas import CommentCreate
 
@@ -25,3 +27,29 @@ def delete_comment(db: Session, comment_id: str):
         db.delete(db_comment)
         db.commit()
     return db_comment
+
+# Variantes asíncronas
+async def get_comment_async(db: AsyncSession, comment_id: str):
+    result = await db.execute(select(Comment).where(Comment.id == comment_id))
+    return result.scalars().first()
+
+async def get_comments_by_ticket_async(db: AsyncSession, ticket_id: str):
+    result = await db.execute(select(Comment).where(Comment.ticket_id == ticket_id))
+    return result.scalars().all()
+
+async def create_comment_async(db: AsyncSession, comment: CommentCreate):
+    db_comment = Comment(
+        content=comment.content,
+        ticket_id=comment.ticket_id,
+        user_id=comment.user_id
+    )
+    db.add(db_comment)
+    await db.commit()
+    return db_comment
+
+async def delete_comment_async(db: AsyncSession, comment_id: str):
+    db_comment = await get_comment_async(db, comment_id)
+    if db_comment:
+        await db.delete(db_comment)
+        await db.commit()
+    return db_comment
@@ -1,23 +1,58 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.database_models import Department
 from models.schemas import DepartmentCreate
+from crud.pagination import paginate
+from crud.errors import DuplicateEntry, is_unique_violation
+
+# El listado ya se ordenaba por id: el cursor usa la clave primaria
+DEPARTMENT_CURSOR_FIELDS = ("id",)
 
 def get_department(db: Session, department_id: str):
     return db.query(Department).filter(Department.id == department_id).first()
 
 def get_department_by_name(db: Session, name: str):
-    return db.query(Department).filter(Department.name == name).first()
+    return db.query(Department).filter(Department.nombre == name).first()
 
-def get_departments(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Department).order_by(Department.id).offset(skip).limit(limit).all()
+def get_departments(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
+    return paginate(db.query(Department), [Department.id], skip, limit, cursor).all()
 
 
 def create_department(db: Session, department: DepartmentCreate):
     db_department = Department(
-        name=department.name,
-        description=department.description
+        nombre=department.nombre
     )
     db.add(db_department)
     db.commit()
     db.refresh(db_department)
-    return db_department
\ No newline at end of file
+    return db_department
+
+# Variantes asíncronas
+async def get_department_async(db: AsyncSession, department_id: str):
+    result = await db.execute(select(Department).where(Department.id == department_id))
+    return result.scalars().first()
+
+async def get_department_by_name_async(db: AsyncSession, name: str):
+    result = await db.execute(select(Department).where(Department.nombre == name))
+    return result.scalars().first()
+
+async def get_departments_async(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str = None):
+    result = await db.execute(paginate(select(Department), [Department.id], skip, limit, cursor))
+    return result.scalars().all()
+
+async def create_department_async(db: AsyncSession, department: DepartmentCreate):
+    db_department = Department(
+        nombre=department.nombre
+    )
+    db.add(db_department)
+    # La restricción UNIQUE de nombre sustituye a la consulta previa
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if is_unique_violation(exc):
+            raise DuplicateEntry()
+        raise
+    return db_department
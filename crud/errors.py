@@ -0,0 +1,19 @@
+# Errores de escritura comunes a los módulos crud.
+# Las escrituras confían en las restricciones UNIQUE de la base de datos en lugar de
+# consultar antes; la violación se traduce a DuplicateEntry para que el endpoint
+# responda con su 400 habitual.
+from sqlalchemy.exc import IntegrityError
+
+# SQL Server: 2627 (UNIQUE/PRIMARY KEY) y 2601 (índice único)
+MSSQL_UNIQUE_ERRORS = ("2627", "2601")
+
+
+class DuplicateEntry(Exception):
+    pass
+
+
+def is_unique_violation(exc: IntegrityError) -> bool:
+    message = str(exc.orig)
+    if "UNIQUE constraint failed" in message:  # SQLite
+        return True
+    return any(code in message for code in MSSQL_UNIQUE_ERRORS)
@@ -1,16 +1,24 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.database_models import Mensaje
 from models.schemas import MensajeCreate
 from datetime import datetime
+from crud.pagination import paginate
+from crud.policy import Principal, check_access_async, mensaje_predicate, restrict
+
+# Orden estable para la paginación por cursor (índices ix_mensage_*_createdAt_id)
+MENSAJE_CURSOR_FIELDS = ("createdAt", "id")
 
 def get_mensaje(db: Session, mensaje_id: str):
     return db.query(Mensaje).filter(Mensaje.id == mensaje_id).first()
 
-def get_mensajes_by_user(db: Session, user_id: str, skip: int = 0, limit: int = 100):
-    return db.query(Mensaje).filter(Mensaje.users_id == user_id).offset(skip).limit(limit).all()
+def get_mensajes_by_user(db: Session, user_id: str, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = db.query(Mensaje).filter(Mensaje.users_id == user_id)
+    return paginate(query, [Mensaje.createdAt, Mensaje.id], skip, limit, cursor).all()
 
-def get_mensajes(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Mensaje).offset(skip).limit(limit).all()
+def get_mensajes(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
+    return paginate(db.query(Mensaje), [Mensaje.createdAt, Mensaje.id], skip, limit, cursor).all()
 
 def create_mensaje(db: Session, mensaje: MensajeCreate):
     db_mensaje = Mensaje(
@@ -37,3 +45,54 @@ def delete_mensaje(db: Session, mensaje_id: str):
         db.delete(db_mensaje)
         db.commit()
     return db_mensaje
+
+# Variantes asíncronas
+# Con principal, solo se devuelven mensajes visibles según la política de acceso
+async def get_mensaje_async(db: AsyncSession, mensaje_id: str, principal: Principal = None):
+    query = select(Mensaje).where(Mensaje.id == mensaje_id)
+    result = await db.execute(restrict(query, mensaje_predicate(principal)))
+    return result.scalars().first()
+
+async def check_mensaje_access_async(db: AsyncSession, mensaje_id: str, principal: Principal):
+    return await check_access_async(db, Mensaje, mensaje_id, mensaje_predicate(principal))
+
+async def get_mensajes_by_user_async(db: AsyncSession, user_id: str, skip: int = 0, limit: int = 100, cursor: str = None):
+    query = select(Mensaje).where(Mensaje.users_id == user_id)
+    result = await db.execute(paginate(query, [Mensaje.createdAt, Mensaje.id], skip, limit, cursor))
+    return result.scalars().all()
+
+async def get_mensajes_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str = None,
+    user_id: str = None,
+    principal: Principal = None
+):
+    query = select(Mensaje)
+    if user_id:
+        query = query.where(Mensaje.users_id == user_id)
+    query = restrict(query, mensaje_predicate(principal))
+    result = await db.execute(paginate(query, [Mensaje.createdAt, Mensaje.id], skip, limit, cursor))
+    return result.scalars().all()
+
+async def create_mensaje_async(db: AsyncSession, mensaje: MensajeCreate):
+    db_mensaje = Mensaje(
+        mensaje=mensaje.mensaje,
+        users_id=mensaje.users_id
+    )
+    db.add(db_mensaje)
+    await db.commit()
+    return db_mensaje
+
+# Reciben el mensaje ya cargado por el endpoint: una sola sentencia, sin volver a leerlo
+async def update_mensaje_async(db: AsyncSession, db_mensaje: Mensaje, mensaje_text: str):
+    db_mensaje.mensaje = mensaje_text
+    db_mensaje.updatedAt = datetime.utcnow()
+    await db.commit()
+    return db_mensaje
+
+async def delete_mensaje_async(db: AsyncSession, db_mensaje: Mensaje):
+    await db.delete(db_mensaje)
+    await db.commit()
+    return db_mensaje
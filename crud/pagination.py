@@ -0,0 +1,64 @@
+# Paginación por cursor (keyset) para los listados.
+# El cursor codifica los valores de las columnas de orden de la última fila devuelta,
+# de modo que la siguiente página se obtiene con un WHERE indexado en lugar de OFFSET.
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, size: int):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise InvalidCursor()
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor()
+    try:
+        return [_decode_value(v) for v in values]
+    except (TypeError, ValueError):
+        raise InvalidCursor()
+
+
+def paginate(query, columns, skip: int = 0, limit: int = 100, cursor: str = None):
+    # Ordena por las columnas dadas (la última debe ser única, p. ej. id) y
+    # aplica el cursor si existe; sin cursor se mantiene el comportamiento skip/limit.
+    query = query.order_by(*columns)
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        # (c1, c2, ...) > (v1, v2, ...) expandido para que funcione también en SQL Server
+        clauses = []
+        for i, column in enumerate(columns):
+            equals = [columns[j] == values[j] for j in range(i)]
+            clauses.append(and_(*equals, column > values[i]))
+        query = query.filter(or_(*clauses))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def next_cursor(items, attributes, limit: int):
+    # Solo hay página siguiente si se devolvió una página completa
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, attr) for attr in attributes])
@@ -0,0 +1,77 @@
+# Política de acceso centralizada.
+# Traduce (rol, usuario, departamento) en predicados SQL que las funciones crud añaden
+# a sus consultas: la misma consulta indexada autoriza y carga, y los listados nunca
+# leen filas que el usuario no puede ver. Un predicado None significa "sin restricción".
+# change_feed.can_see aplica las mismas reglas de VIEW a los eventos en memoria.
+from sqlalchemy import case, exists, false, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database_models import Attachment, Mensaje, Ticket
+
+ADMINISTRADOR = "administrador"
+SOPORTE = "soporte"
+USUARIO = "usuario"
+
+# Acciones sobre tickets
+VIEW = "ver"
+UPDATE = "actualizar"
+COMMENT = "comentar"
+# Adjuntar y eliminar archivos: solo el solicitante (y administradores)
+ATTACH = "adjuntar"
+
+
+class Principal:
+
+    def __init__(self, user_id: str, role: str, departamento_id: str = None):
+        self.user_id = user_id
+        self.role = role
+        self.departamento_id = departamento_id
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.role, getattr(user, "departamento_id", None))
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == ADMINISTRADOR
+
+
+def ticket_predicate(principal: Principal, action: str = VIEW):
+    if principal is None or principal.is_admin:
+        return None
+    own = Ticket.user_id == principal.user_id
+    if action == ATTACH or principal.role == USUARIO:
+        return own
+    if principal.role == SOPORTE:
+        # Sin departamento solo ve lo asignado (evita emparejar tickets sin departamento)
+        assigned = Ticket.assigned_to == principal.user_id
+        if principal.departamento_id is None:
+            return assigned
+        return (Ticket.departamento_id == principal.departamento_id) | assigned
+    # Rol desconocido: nada visible
+    return false()
+
+def attachment_predicate(principal: Principal, action: str = VIEW):
+    # Los adjuntos heredan los permisos de su ticket (EXISTS correlacionado por clave primaria)
+    predicate = ticket_predicate(principal, action)
+    if predicate is None:
+        return None
+    return exists().where(Ticket.id == Attachment.ticket_id, predicate)
+
+def mensaje_predicate(principal: Principal):
+    if principal is None or principal.is_admin:
+        return None
+    return Mensaje.users_id == principal.user_id
+
+
+def restrict(query, predicate):
+    # Sirve tanto para Query como para select()
+    return query if predicate is None else query.filter(predicate)
+
+async def check_access_async(db: AsyncSession, model, object_id: str, predicate):
+    # Solo para el caso en que la consulta autorizada no devolvió fila: distingue entre
+    # objeto inexistente (None) y existente sin permiso (False)
+    allowed = literal(1) if predicate is None else case((predicate, 1), else_=0)
+    result = await db.execute(select(allowed).where(model.id == object_id))
+    value = result.scalar()
+    return None if value is None else bool(value)
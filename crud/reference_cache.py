@@ -0,0 +1,147 @@
+# Caché de lectura para datos de referencia (departamentos, categorías y su relación).
+# Cada espacio de nombres tiene una versión; cualquier escritura confirmada sobre sus
+# tablas incrementa la versión y las entradas anteriores dejan de ser visibles.
+# Las mismas versiones generan los ETag de los endpoints.
+# Las versiones solo se incrementan en el proceso que escribe: otros workers, los scripts
+# de carga o cambios directos en la base no las ven. Por eso las entradas caducan además
+# cada REFERENCE_CACHE_TTL_SECONDS (una época que forma parte de la versión), lo que acota
+# el tiempo que un proceso puede servir datos o ETags de otra versión.
+import os
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.database_models import Categoria, CategoriaDepartamento, Department
+
+DEPARTMENTS = "departments"
+CATEGORIAS = "categorias"
+CATEGORIA_DEPARTAMENTO = "categoria_departamento"
+
+# Las claves incluyen skip/limit/cursor enviados por el cliente: sin tope, peticiones con
+# valores distintos harían crecer la memoria del proceso. Se olvidan primero las menos usadas.
+REFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("REFERENCE_CACHE_MAX_ENTRIES", "512"))
+# 0 desactiva la caducidad (un único proceso y todas las escrituras a través de la API)
+REFERENCE_CACHE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "60"))
+
+# Identificador de arranque: evita repetir ETags si el proceso se reinicia con versión 0
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class VersionedCache:
+
+    def __init__(self, max_entries: int = REFERENCE_CACHE_MAX_ENTRIES, ttl: float = REFERENCE_CACHE_TTL_SECONDS, clock=time.monotonic):
+        self._lock = Lock()
+        self._versions = {}
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._epoch = self._current_epoch()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _current_epoch(self) -> int:
+        return int(self._clock() // self.ttl) if self.ttl > 0 else 0
+
+    def _refresh_epoch(self) -> int:
+        # Llamar con el bloqueo tomado: al cambiar de época todas las entradas caducan
+        epoch = self._current_epoch()
+        if epoch != self._epoch:
+            self._epoch = epoch
+            self.expirations += len(self._entries)
+            self._entries.clear()
+        return epoch
+
+    def version(self, *namespaces):
+        with self._lock:
+            return (self._refresh_epoch(),) + tuple(self._versions.get(namespace, 0) for namespace in namespaces)
+
+    def bump(self, namespace: str):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            # Las entradas de versiones anteriores ya no se pueden alcanzar
+            self._entries = OrderedDict(
+                (key, value) for key, value in self._entries.items()
+                if namespace not in key[0]
+            )
+
+    def etag(self, *namespaces) -> str:
+        versions = "-".join(str(v) for v in self.version(*namespaces))
+        return f'"{"+".join(namespaces)}-{_BOOT_ID}-{versions}"'
+
+    async def get_or_load(self, namespaces: tuple, key, loader):
+        # La versión se lee antes de cargar: si hay una escritura durante la carga,
+        # el resultado queda guardado con la versión antigua y no se volverá a servir
+        cache_key = (namespaces, self.version(*namespaces), key)
+        with self._lock:
+            if cache_key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(cache_key)
+                return self._entries[cache_key]
+            self.misses += 1
+        value = await loader()
+        with self._lock:
+            self._entries[cache_key] = value
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                "versions": dict(self._versions),
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+reference_cache = VersionedCache()
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+# Invalidación: se anotan los espacios modificados en el flush y se incrementa la
+# versión solo tras el commit, para no cachear datos aún no confirmados.
+_NAMESPACES_BY_MODEL = {
+    Department: DEPARTMENTS,
+    Categoria: CATEGORIAS,
+    CategoriaDepartamento: CATEGORIA_DEPARTAMENTO,
+}
+
+def mark_reference_change(session, namespace: str):
+    # Para escrituras con sentencias Core (UPDATE ... RETURNING), que after_flush no ve
+    session.info.setdefault("reference_changes", set()).add(namespace)
+
+@event.listens_for(Session, "after_flush")
+def _collect_reference_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        namespace = _NAMESPACES_BY_MODEL.get(type(obj))
+        if namespace:
+            session.info.setdefault("reference_changes", set()).add(namespace)
+
+@event.listens_for(Session, "after_commit")
+def _bump_reference_versions(session):
+    for namespace in session.info.pop("reference_changes", ()):
+        reference_cache.bump(namespace)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_reference_changes(session):
+    session.info.pop("reference_changes", None)
@@ -0,0 +1,200 @@
+# Búsqueda de texto completo sobre tickets (título y descripción), comentarios y mensajes.
+# SQLite: tabla FTS5 mantenida por triggers en cada escritura.
+# SQL Server: catálogo de texto completo con CHANGE_TRACKING AUTO (actualización incremental).
+import re
+
+from sqlalchemy import Float, String, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import Base
+from models.database_models import Ticket
+from crud.tickets import filter_tickets, ticket_load_options
+from crud.policy import Principal
+
+SEARCH_MAX_TERMS = 8
+
+# --- SQLite (FTS5) -------------------------------------------------------------
+# search_doc asigna un rowid estable a cada documento para poder actualizar y borrar
+# en search_fts por rowid sin recorrer la tabla virtual.
+SQLITE_SEARCH_DDL = [
+    """CREATE TABLE IF NOT EXISTS search_doc (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        ref_id TEXT NOT NULL,
+        ticket_id TEXT,
+        UNIQUE (kind, ref_id)
+    )""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_fts
+        USING fts5(body, tokenize = 'unicode61 remove_diacritics 2')""",
+]
+
+def _sqlite_triggers(table, kind, id_col, ticket_expr, body_expr, watched):
+    doc_id = f"(SELECT id FROM search_doc WHERE kind = '{kind}' AND ref_id = {{row}}.{id_col})"
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS search_{kind}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO search_doc (kind, ref_id, ticket_id) VALUES ('{kind}', NEW.{id_col}, {ticket_expr.format(row="NEW")});
+            INSERT INTO search_fts (rowid, body) VALUES ({doc_id.format(row="NEW")}, {body_expr.format(row="NEW")});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS search_{kind}_au AFTER UPDATE OF {watched} ON {table} BEGIN
+            UPDATE search_doc SET ticket_id = {ticket_expr.format(row="NEW")} WHERE kind = '{kind}' AND ref_id = NEW.{id_col};
+            UPDATE search_fts SET body = {body_expr.format(row="NEW")} WHERE rowid = {doc_id.format(row="NEW")};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS search_{kind}_ad AFTER DELETE ON {table} BEGIN
+            DELETE FROM search_fts WHERE rowid = {doc_id.format(row="OLD")};
+            DELETE FROM search_doc WHERE kind = '{kind}' AND ref_id = OLD.{id_col};
+        END""",
+    ]
+
+SQLITE_SEARCH_TRIGGERS = (
+    _sqlite_triggers(
+        "ticket", "ticket", "id", "{row}.id",
+        "coalesce({row}.title, '') || ' ' || coalesce({row}.descripcion, '')",
+        "title, descripcion",
+    )
+    + _sqlite_triggers(
+        "comments", "comment", "id", "{row}.ticket_id",
+        "coalesce({row}.content, '')",
+        "content, ticket_id",
+    )
+    + _sqlite_triggers(
+        "mensage", "mensaje", "id", "NULL",
+        "coalesce({row}.mensaje, '')",
+        "mensaje",
+    )
+)
+
+# Carga inicial o reconstrucción completa a partir de las tablas
+SQLITE_SEARCH_REBUILD = [
+    "DELETE FROM search_fts",
+    "DELETE FROM search_doc",
+    "INSERT INTO search_doc (kind, ref_id, ticket_id) SELECT 'ticket', id, id FROM ticket",
+    "INSERT INTO search_doc (kind, ref_id, ticket_id) SELECT 'comment', id, ticket_id FROM comments",
+    "INSERT INTO search_doc (kind, ref_id, ticket_id) SELECT 'mensaje', id, NULL FROM mensage",
+    """INSERT INTO search_fts (rowid, body)
+        SELECT d.id, coalesce(t.title, '') || ' ' || coalesce(t.descripcion, '')
+        FROM search_doc d JOIN ticket t ON d.kind = 'ticket' AND t.id = d.ref_id""",
+    """INSERT INTO search_fts (rowid, body)
+        SELECT d.id, coalesce(c.content, '')
+        FROM search_doc d JOIN comments c ON d.kind = 'comment' AND c.id = d.ref_id""",
+    """INSERT INTO search_fts (rowid, body)
+        SELECT d.id, coalesce(m.mensaje, '')
+        FROM search_doc d JOIN mensage m ON d.kind = 'mensaje' AND m.id = d.ref_id""",
+]
+
+# Puntuación por ticket: bm25 es menor cuanto más relevante, por eso se invierte.
+# Los mensajes se asocian a los tickets que los referencian (ticket.menssage_id).
+SQLITE_SEARCH_HITS = """
+    SELECT hits.ticket_id AS ticket_id, SUM(hits.score) AS score FROM (
+        SELECT d.ticket_id AS ticket_id, -bm25(search_fts) AS score
+        FROM search_fts JOIN search_doc d ON d.id = search_fts.rowid
+        WHERE search_fts MATCH :query AND d.kind IN ('ticket', 'comment')
+        UNION ALL
+        SELECT t.id AS ticket_id, -bm25(search_fts) AS score
+        FROM search_fts
+        JOIN search_doc d ON d.id = search_fts.rowid
+        JOIN ticket t ON t.menssage_id = d.ref_id
+        WHERE search_fts MATCH :query AND d.kind = 'mensaje'
+    ) AS hits
+    GROUP BY hits.ticket_id
+"""
+
+# --- SQL Server (full-text catalog) -------------------------------------------
+# KEY INDEX necesita el nombre real de la clave primaria, que SQL Server genera.
+MSSQL_SEARCH_DDL = [
+    """IF NOT EXISTS (SELECT 1 FROM sys.fulltext_catalogs WHERE name = 'ticket_search_catalog')
+        CREATE FULLTEXT CATALOG ticket_search_catalog""",
+] + [
+    f"""IF NOT EXISTS (SELECT 1 FROM sys.fulltext_indexes WHERE object_id = OBJECT_ID('{table}'))
+    BEGIN
+        DECLARE @pk sysname = (
+            SELECT name FROM sys.indexes WHERE object_id = OBJECT_ID('{table}') AND is_primary_key = 1
+        );
+        EXEC('CREATE FULLTEXT INDEX ON {table} ({columns}) KEY INDEX ' + @pk +
+             ' ON ticket_search_catalog WITH CHANGE_TRACKING AUTO');
+    END"""
+    for table, columns in (
+        ("ticket", "title, descripcion"),
+        ("comments", "content"),
+        ("mensage", "mensaje"),
+    )
+]
+
+MSSQL_SEARCH_HITS = """
+    SELECT hits.ticket_id AS ticket_id, CAST(SUM(hits.score) AS FLOAT) AS score FROM (
+        SELECT k.[KEY] AS ticket_id, k.[RANK] AS score
+        FROM CONTAINSTABLE(ticket, (title, descripcion), :query) AS k
+        UNION ALL
+        SELECT c.ticket_id AS ticket_id, k.[RANK] AS score
+        FROM CONTAINSTABLE(comments, content, :query) AS k
+        JOIN comments c ON c.id = k.[KEY]
+        UNION ALL
+        SELECT t.id AS ticket_id, k.[RANK] AS score
+        FROM CONTAINSTABLE(mensage, mensaje, :query) AS k
+        JOIN ticket t ON t.menssage_id = k.[KEY]
+    ) AS hits
+    GROUP BY hits.ticket_id
+"""
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_search_index(target, connection, **kw):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        statements = SQLITE_SEARCH_DDL + SQLITE_SEARCH_TRIGGERS
+    elif dialect == "mssql":
+        statements = MSSQL_SEARCH_DDL
+    else:
+        return
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+def rebuild_search_index(connection):
+    # En SQL Server el catálogo se repuebla solo; en SQLite se recarga desde las tablas
+    if connection.dialect.name == "sqlite":
+        install_search_index(None, connection)
+        for statement in SQLITE_SEARCH_REBUILD:
+            connection.exec_driver_sql(statement)
+    elif connection.dialect.name == "mssql":
+        install_search_index(None, connection)
+        for table in ("ticket", "comments", "mensage"):
+            connection.exec_driver_sql(f"ALTER FULLTEXT INDEX ON {table} START FULL POPULATION")
+
+
+def build_match_query(q: str, dialect: str):
+    # Solo palabras: evita errores de sintaxis de MATCH/CONTAINS con la entrada del usuario.
+    # Cada término se busca por prefijo y todos deben aparecer.
+    terms = re.findall(r"\w+", q, flags=re.UNICODE)[:SEARCH_MAX_TERMS]
+    if not terms:
+        return None
+    if dialect == "mssql":
+        return " AND ".join(f'"{term}*"' for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+async def search_tickets_async(
+    db: AsyncSession,
+    q: str,
+    principal: Principal = None,
+    limit: int = 50
+):
+    dialect = db.bind.dialect.name
+    query = build_match_query(q, dialect)
+    if query is None:
+        return []
+    hits_sql = MSSQL_SEARCH_HITS if dialect == "mssql" else SQLITE_SEARCH_HITS
+    hits = (
+        text(hits_sql)
+        .bindparams(query=query)
+        .columns(ticket_id=String, score=Float)
+        .subquery("hits")
+    )
+    # El filtrado por rol se aplica en la misma consulta que la búsqueda
+    statement = (
+        select(Ticket)
+        .join(hits, hits.c.ticket_id == Ticket.id)
+        .options(*ticket_load_options("list"))
+    )
+    statement = filter_tickets(statement, principal=principal)
+    statement = statement.order_by(hits.c.score.desc(), Ticket.id).limit(limit)
+    result = await db.execute(statement)
+    return result.scalars().all()
@@ -0,0 +1,128 @@
+# Estadísticas de tickets mantenidas de forma incremental.
+# Cada inserción, cambio o borrado de un Ticket ajusta los contadores de ticket_stats
+# dentro de la misma transacción (eventos de mapper), de modo que el panel lee unas
+# pocas filas en lugar de recorrer la tabla ticket.
+from collections import Counter
+
+from sqlalchemy import delete, event, func, insert, inspect, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database_models import Ticket, TicketStat
+
+STAT_DIMENSIONS = ("status", "departamento_id", "categoria_id", "assigned_to")
+# Valor usado para tickets sin departamento, categoría o asignación
+EMPTY_VALUE = "sin_asignar"
+
+MSSQL_UPSERT = text("""
+    MERGE ticket_stats WITH (HOLDLOCK) AS target
+    USING (SELECT :dimension AS dimension, :value AS value) AS source
+    ON target.dimension = source.dimension AND target.value = source.value
+    WHEN MATCHED THEN UPDATE SET count = target.count + :delta
+    WHEN NOT MATCHED THEN INSERT (dimension, value, count) VALUES (:dimension, :value, :delta);
+""")
+
+
+def _key(value):
+    return EMPTY_VALUE if value is None else str(value)
+
+def stat_upsert_statements(dialect_name: str, deltas: Counter):
+    # (sentencia, inserción si no afectó a ninguna fila) por contador modificado; se
+    # omiten los deltas nulos. SQL Server y SQLite usan su upsert nativo; el resto de
+    # dialectos, UPDATE y, si la fila aún no existe, INSERT.
+    statements = []
+    for (dimension, value), delta in sorted(deltas.items()):
+        if delta == 0:
+            continue
+        if dialect_name == "mssql":
+            statements.append((MSSQL_UPSERT.bindparams(dimension=dimension, value=value, delta=delta), None))
+        elif dialect_name == "sqlite":
+            statement = sqlite_insert(TicketStat).values(dimension=dimension, value=value, count=delta)
+            statements.append((statement.on_conflict_do_update(
+                index_elements=[TicketStat.dimension, TicketStat.value],
+                set_={"count": TicketStat.count + delta},
+            ), None))
+        else:
+            statements.append((
+                update(TicketStat)
+                .where(TicketStat.dimension == dimension, TicketStat.value == value)
+                .values(count=TicketStat.count + delta),
+                insert(TicketStat).values(dimension=dimension, value=value, count=delta),
+            ))
+    return statements
+
+def _apply(connection, deltas: Counter):
+    for statement, insert_if_missing in stat_upsert_statements(connection.dialect.name, deltas):
+        result = connection.execute(statement)
+        if insert_if_missing is not None and result.rowcount == 0:
+            connection.execute(insert_if_missing)
+
+
+@event.listens_for(Ticket, "after_insert")
+def _count_inserted_ticket(mapper, connection, target):
+    _apply(connection, Counter({(dimension, _key(getattr(target, dimension))): 1 for dimension in STAT_DIMENSIONS}))
+
+@event.listens_for(Ticket, "after_update")
+def _count_updated_ticket(mapper, connection, target):
+    state = inspect(target)
+    deltas = Counter()
+    for dimension in STAT_DIMENSIONS:
+        history = state.attrs[dimension].history
+        if not history.has_changes():
+            continue
+        for old_value in history.deleted:
+            deltas[(dimension, _key(old_value))] -= 1
+        for new_value in history.added:
+            deltas[(dimension, _key(new_value))] += 1
+    _apply(connection, deltas)
+
+@event.listens_for(Ticket, "after_delete")
+def _count_deleted_ticket(mapper, connection, target):
+    _apply(connection, Counter({(dimension, _key(getattr(target, dimension))): -1 for dimension in STAT_DIMENSIONS}))
+
+
+def bulk_update_deltas(old_rows, update_data: dict):
+    # Deltas para un UPDATE masivo (los eventos de mapper no se disparan con Core).
+    # old_rows: filas con los valores previos de las dimensiones afectadas.
+    deltas = Counter()
+    for dimension in STAT_DIMENSIONS:
+        if dimension not in update_data:
+            continue
+        new_value = _key(update_data[dimension])
+        for row in old_rows:
+            old_value = _key(getattr(row, dimension))
+            if old_value != new_value:
+                deltas[(dimension, old_value)] -= 1
+                deltas[(dimension, new_value)] += 1
+    return deltas
+
+async def apply_stat_deltas_async(db: AsyncSession, deltas: Counter):
+    for statement, insert_if_missing in stat_upsert_statements(db.bind.dialect.name, deltas):
+        result = await db.execute(statement)
+        if insert_if_missing is not None and result.rowcount == 0:
+            await db.execute(insert_if_missing)
+
+
+async def get_ticket_stats_async(db: AsyncSession):
+    result = await db.execute(select(TicketStat).where(TicketStat.count != 0))
+    stats = {dimension: {} for dimension in STAT_DIMENSIONS}
+    total = 0
+    for stat in result.scalars().all():
+        stats.setdefault(stat.dimension, {})[stat.value] = stat.count
+        if stat.dimension == "status":
+            total += stat.count
+    stats["total"] = total
+    return stats
+
+
+def rebuild_ticket_stats(connection):
+    # Recalcula todos los contadores desde la tabla ticket (una agrupación por dimensión)
+    connection.execute(delete(TicketStat))
+    for dimension in STAT_DIMENSIONS:
+        column = getattr(Ticket, dimension)
+        rows = connection.execute(select(column, func.count()).select_from(Ticket).group_by(column)).all()
+        if rows:
+            connection.execute(
+                TicketStat.__table__.insert(),
+                [{"dimension": dimension, "value": _key(value), "count": count} for value, count in rows],
+            )
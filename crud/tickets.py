@@ -1,10 +1,87 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import case, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, raiseload
 from models.database_models import Ticket, Comment
 from models.schemas import TicketCreate, TicketUpdate, CommentCreate
 from datetime import datetime
+from crud.pagination import paginate
+from crud.stats import STAT_DIMENSIONS, apply_stat_deltas_async, bulk_update_deltas
+from crud.change_feed import change_feed, ticket_audience_from_row
+from crud.policy import UPDATE, VIEW, Principal, check_access_async, restrict, ticket_predicate
 
-def get_ticket(db: Session, ticket_id: str):
-    return db.query(Ticket).filter(Ticket.id == ticket_id).first()
+# Orden estable para la paginación por cursor (índice ix_ticket_createdAt_id)
+TICKET_CURSOR_FIELDS = ("createdAt", "id")
+
+# Límite de tickets por actualización masiva; los IN se parten en lotes para no
+# superar el máximo de parámetros por sentencia de SQL Server (2100)
+BULK_UPDATE_MAX_TICKETS = 1000
+BULK_UPDATE_BATCH_SIZE = 500
+
+# Perfiles de carga de relaciones. selectinload resuelve cada relación con una sola
+# consulta IN para toda la página, así el número de consultas no depende del tamaño
+# de la página. En "list" cualquier otra relación queda bloqueada (raiseload) para
+# detectar accesos perezosos que reintroducirían el problema N+1.
+TICKET_LOAD_PROFILES = {
+    # Solo columnas del ticket, p. ej. para comprobar permisos
+    "minimal": (
+        raiseload("*"),
+    ),
+    "list": (
+        selectinload(Ticket.comments),
+        raiseload("*"),
+    ),
+    # Lo que serializa schemas.Ticket: adjuntos, usuarios, categoría y departamento
+    # tienen sus propios endpoints y cargarlos aquí serían consultas desperdiciadas
+    "detail": (
+        selectinload(Ticket.comments),
+        raiseload("*"),
+    ),
+}
+
+# Campos de TicketUpdate que corresponden a columnas de ticket (nombre en la tabla).
+# priority no tiene columna: pedir su cambio es un error del cliente, no se ignora
+TICKET_UPDATE_COLUMNS = {
+    "title": "title",
+    "description": "descripcion",
+    "status": "status",
+    "assigned_to": "assigned_to",
+}
+
+class UnsupportedTicketField(Exception):
+
+    def __init__(self, fields):
+        super().__init__(", ".join(fields))
+        self.fields = fields
+
+class EmptyBulkFilter(Exception):
+    pass
+
+def ticket_update_values(ticket_update: TicketUpdate) -> dict:
+    # {columna: valor} con los campos enviados; UnsupportedTicketField si alguno no existe
+    update_data = ticket_update.dict(exclude_unset=True)
+    unsupported = sorted(set(update_data) - set(TICKET_UPDATE_COLUMNS))
+    if unsupported:
+        raise UnsupportedTicketField(unsupported)
+    return {TICKET_UPDATE_COLUMNS[key]: value for key, value in update_data.items()}
+
+def ticket_load_options(profile: str):
+    return TICKET_LOAD_PROFILES[profile]
+
+def get_ticket(db: Session, ticket_id: str, profile: str = "detail", principal: Principal = None, action: str = VIEW):
+    query = db.query(Ticket).options(*ticket_load_options(profile)).filter(Ticket.id == ticket_id)
+    return restrict(query, ticket_predicate(principal, action)).first()
+
+def filter_tickets(query, status: str = None, departamento: str = None, principal: Principal = None):
+    # Filtros comunes del listado; sirve tanto para Query como para select()
+    if status:
+        query = query.filter(Ticket.status == status)
+    
+    if departamento:
+        query = query.filter(Ticket.departamento_id == departamento)
+    
+    # Visibilidad según la política de acceso
+    return restrict(query, ticket_predicate(principal, VIEW))
 
 def get_tickets(
     db: Session, 
@@ -12,35 +89,22 @@ def get_tickets(
     limit: int = 100, 
     status: str = None,
     departamento: str = None,
-    user_id: str = None,
-    role: str = None
+    principal: Principal = None,
+    cursor: str = None,
+    profile: str = "list"
 ):
-    query = db.query(Ticket)
-    
-    if status:
-        query = query.filter(Ticket.status == status)
-    
-    if departamento:
-        query = query.filter(Ticket.departamento == departamento)
+    query = db.query(Ticket).options(*ticket_load_options(profile))
+    query = filter_tickets(query, status, departamento, principal)
     
-    # Filtrar por rol y usuario
-    if role == "usuario":
-        query = query.filter(Ticket.requested_by == user_id)
-    elif role == "soporte":
-        query = query.filter(
-            (Ticket.departamento == departamento) | (Ticket.assigned_to == user_id)
-        )
-    
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, [Ticket.createdAt, Ticket.id], skip, limit, cursor).all()
 
 def create_ticket(db: Session, ticket: TicketCreate, user_id: str):
     db_ticket = Ticket(
         title=ticket.title,
-        description=ticket.description,
-        departamento=ticket.departamento,
-        priority=ticket.priority,
+        descripcion=ticket.description,
+        departamento_id=ticket.departamento_id,
         status="abierto",
-        requested_by=user_id
+        user_id=user_id
     )
     db.add(db_ticket)
     db.commit()
@@ -48,17 +112,17 @@ def create_ticket(db: Session, ticket: TicketCreate, user_id: str):
     return db_ticket
 
 def update_ticket(db: Session, ticket_id: str, ticket_update: TicketUpdate):
-    db_ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    db_ticket = db.query(Ticket).filter(Ticket.id == ticket_id).with_for_update().first()
     
     if not db_ticket:
         return None
     
-    update_data = ticket_update.dict(exclude_unset=True)
+    update_data = ticket_update_values(ticket_update)
     
     for key, value in update_data.items():
         setattr(db_ticket, key, value)
     
-    db_ticket.updated_at = datetime.utcnow()
+    db_ticket.updatedAt = datetime.utcnow()
     
     db.commit()
     db.refresh(db_ticket)
@@ -73,4 +137,239 @@ def add_comment(db: Session, ticket_id: str, comment: CommentCreate, user_id: st
     db.add(db_comment)
     db.commit()
     db.refresh(db_comment)
-    return db_comment
\ No newline at end of file
+    return db_comment
+
+# Variantes asíncronas
+# Con AsyncSession no hay carga perezosa: las relaciones necesarias vienen del perfil.
+# Con principal, la consulta solo devuelve el ticket si la política permite la acción.
+async def get_ticket_async(
+    db: AsyncSession,
+    ticket_id: str,
+    profile: str = "detail",
+    principal: Principal = None,
+    action: str = VIEW,
+    for_update: bool = False
+):
+    query = select(Ticket).options(*ticket_load_options(profile)).where(Ticket.id == ticket_id)
+    if for_update:
+        # Para modificarlo: los valores previos (deltas de ticket_stats) se leen con la
+        # fila bloqueada dentro de la transacción de escritura (UPDLOCK en SQL Server,
+        # el escritor único en SQLite)
+        query = query.with_for_update()
+    result = await db.execute(restrict(query, ticket_predicate(principal, action)))
+    return result.scalars().first()
+
+async def check_ticket_access_async(db: AsyncSession, ticket_id: str, principal: Principal, action: str = VIEW):
+    return await check_access_async(db, Ticket, ticket_id, ticket_predicate(principal, action))
+
+async def get_tickets_async(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    status: str = None,
+    departamento: str = None,
+    principal: Principal = None,
+    cursor: str = None,
+    profile: str = "list"
+):
+    query = select(Ticket).options(*ticket_load_options(profile))
+    query = filter_tickets(query, status, departamento, principal)
+
+    result = await db.execute(paginate(query, [Ticket.createdAt, Ticket.id], skip, limit, cursor))
+    return result.scalars().all()
+
+# Sondas de versión para peticiones condicionales: consultas baratas que no cargan
+# las filas completas. Incluyen los comentarios porque forman parte de la respuesta
+# y añadir uno no modifica Ticket.updatedAt.
+async def get_ticket_version_async(db: AsyncSession, ticket_id: str, principal: Principal = None):
+    comment_count = (
+        select(func.count(Comment.id)).where(Comment.ticket_id == Ticket.id).scalar_subquery()
+    )
+    last_comment_at = (
+        select(func.max(Comment.created_at)).where(Comment.ticket_id == Ticket.id).scalar_subquery()
+    )
+    query = select(
+        Ticket.id,
+        Ticket.updatedAt,
+        comment_count.label("comment_count"),
+        last_comment_at.label("last_comment_at"),
+    ).where(Ticket.id == ticket_id)
+    result = await db.execute(restrict(query, ticket_predicate(principal, VIEW)))
+    return result.first()
+
+async def get_tickets_version_async(
+    db: AsyncSession,
+    status: str = None,
+    departamento: str = None,
+    principal: Principal = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str = None
+):
+    # Solo la página pedida (mismo ORDER BY, cursor y LIMIT que get_tickets_async):
+    # (id, updatedAt) de sus tickets y el número y último comentario de esos tickets.
+    # Recorrer todo el conjunto filtrado costaría más que cargar la página.
+    query = filter_tickets(select(Ticket.id, Ticket.updatedAt), status, departamento, principal)
+    page = (await db.execute(paginate(query, [Ticket.createdAt, Ticket.id], skip, limit, cursor))).all()
+    ticket_ids = [row.id for row in page]
+    comments_row = (None, None)
+    if ticket_ids:
+        comments_row = (await db.execute(
+            select(func.count(Comment.id), func.max(Comment.created_at)).where(Comment.ticket_id.in_(ticket_ids))
+        )).first()
+    return tuple((row.id, row.updatedAt) for row in page), comments_row[0], comments_row[1]
+
+async def create_ticket_async(db: AsyncSession, ticket: TicketCreate, user_id: str):
+    db_ticket = Ticket(
+        title=ticket.title,
+        descripcion=ticket.description,
+        departamento_id=ticket.departamento_id,
+        status="abierto",
+        user_id=user_id,
+        # Colección inicializada: la respuesta no necesita releer el ticket
+        comments=[]
+    )
+    db.add(db_ticket)
+    await db.commit()
+    return db_ticket
+
+async def update_ticket_async(db: AsyncSession, db_ticket: Ticket, ticket_update: TicketUpdate):
+    # Recibe el ticket ya cargado por el endpoint (con sus comentarios): un único UPDATE
+    update_data = ticket_update_values(ticket_update)
+
+    for key, value in update_data.items():
+        setattr(db_ticket, key, value)
+
+    db_ticket.updatedAt = datetime.utcnow()
+
+    await db.commit()
+    return db_ticket
+
+async def add_comment_async(db: AsyncSession, ticket_id: str, comment: CommentCreate, user_id: str):
+    db_comment = Comment(
+        content=comment.content,
+        ticket_id=ticket_id,
+        user_id=user_id
+    )
+    db.add(db_comment)
+    await db.commit()
+    return db_comment
+
+# Exportación: columnas del ticket (sin relaciones) en el orden del CSV
+EXPORT_COLUMNS = (
+    "id", "title", "descripcion", "status", "departamento_id", "categoria_id",
+    "user_id", "assigned_to", "createdAt", "updatedAt",
+)
+EXPORT_BATCH_SIZE = 1000
+
+async def stream_tickets_async(
+    db: AsyncSession,
+    principal: Principal = None,
+    status: str = None,
+    departamento: str = None,
+    since: datetime = None,
+    until: datetime = None
+):
+    # Filas (no objetos ORM) leídas por lotes de un cursor del servidor con yield_per:
+    # la memoria no depende del número de tickets exportados
+    query = select(*(getattr(Ticket, column) for column in EXPORT_COLUMNS))
+    query = filter_tickets(query, status, departamento, principal)
+    if since:
+        query = query.where(Ticket.createdAt >= since)
+    if until:
+        query = query.where(Ticket.createdAt < until)
+    query = query.order_by(Ticket.createdAt, Ticket.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    result = await db.stream(query)
+    try:
+        async for row in result:
+            yield row
+    finally:
+        await result.close()
+
+class BulkUpdateTooLarge(Exception):
+    pass
+
+def _batches(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+async def bulk_update_tickets_async(
+    db: AsyncSession,
+    ticket_update: TicketUpdate,
+    principal: Principal,
+    ticket_ids: list = None,
+    filters: dict = None
+):
+    # Aplica la misma actualización a varios tickets en una sola transacción con
+    # UPDATE ... WHERE id IN (...). Devuelve (actualizados, [(id, resultado), ...]).
+    update_data = ticket_update_values(ticket_update)
+    # Un filtro vacío seleccionaría todos los tickets visibles para el usuario
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    if ticket_ids is None and not filters:
+        raise EmptyBulkFilter()
+    results = {}
+    allowed = []
+    # Valores previos de las dimensiones de estadísticas de los tickets a actualizar, leídos
+    # con las filas bloqueadas: dos cambios simultáneos no restan dos veces del mismo valor
+    columns = [Ticket.id, Ticket.user_id] + [getattr(Ticket, dimension) for dimension in STAT_DIMENSIONS]
+    old_rows = []
+    predicate = ticket_predicate(principal, UPDATE)
+
+    if ticket_ids is not None:
+        requested = list(dict.fromkeys(ticket_ids))
+        if len(requested) > BULK_UPDATE_MAX_TICKETS:
+            raise BulkUpdateTooLarge()
+        # El permiso se evalúa en la misma consulta para informar resultado por ticket
+        allowed_column = (literal(1) if predicate is None else case((predicate, 1), else_=0)).label("allowed")
+        found = {}
+        for batch in _batches(requested, BULK_UPDATE_BATCH_SIZE):
+            rows = await db.execute(
+                select(*columns, allowed_column).where(Ticket.id.in_(batch)).with_for_update()
+            )
+            found.update({row.id: row for row in rows})
+        for ticket_id in requested:
+            if ticket_id not in found:
+                results[ticket_id] = "no_encontrado"
+            elif not found[ticket_id].allowed:
+                results[ticket_id] = "sin_permiso"
+            else:
+                results[ticket_id] = "actualizado"
+                allowed.append(ticket_id)
+                old_rows.append(found[ticket_id])
+    else:
+        # Por filtro: solo se seleccionan los tickets que el usuario puede modificar
+        query = select(*columns)
+        for key, value in filters.items():
+            query = query.where(getattr(Ticket, key) == value)
+        query = restrict(query, predicate)
+        old_rows = (await db.execute(query.limit(BULK_UPDATE_MAX_TICKETS + 1).with_for_update())).all()
+        if len(old_rows) > BULK_UPDATE_MAX_TICKETS:
+            raise BulkUpdateTooLarge()
+        allowed = [row.id for row in old_rows]
+        results = {ticket_id: "actualizado" for ticket_id in allowed}
+
+    updated = 0
+    if allowed and update_data:
+        update_data["updatedAt"] = datetime.utcnow()
+        for batch in _batches(allowed, BULK_UPDATE_BATCH_SIZE):
+            result = await db.execute(
+                update(Ticket)
+                .where(Ticket.id.in_(batch))
+                .values(**update_data)
+                .execution_options(synchronize_session=False)
+            )
+            updated += result.rowcount
+        # Los eventos de mapper no ven este UPDATE: ajustar las estadísticas aquí
+        await apply_stat_deltas_async(db, bulk_update_deltas(old_rows, update_data))
+    await db.commit()
+
+    # Tampoco los eventos de sesión ven el UPDATE masivo: publicar en el feed de cambios
+    if allowed and update_data:
+        events = []
+        for row in old_rows:
+            audience = ticket_audience_from_row(row)
+            if update_data.get("assigned_to"):
+                audience["assigned_to"].append(str(update_data["assigned_to"]))
+            events.append({"type": "ticket.updated", "id": str(row.id), "ticket_id": str(row.id), "audience": audience})
+        change_feed.publish(events)
+    return updated, list(results.items())
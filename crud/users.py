@@ -1,13 +1,18 @@
 from unittest import skip
 from xml.etree.ElementInclude import LimitedRecursiveIncludeError
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.database_models import User
 from models.schemas import UserCreate
-from passlib.context import CryptContext
 from sqlalchemy import asc
+from utils.security import pwd_context, hash_password_async, verify_password_async
+from crud.pagination import paginate
+from crud.errors import DuplicateEntry, is_unique_violation
 
-# Configuración para el hash de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Orden estable para la paginación por cursor (índice ix_users_created_at_id)
+USER_CURSOR_FIELDS = ("created_at", "id")
 
 def get_password_hash(password):
     return pwd_context.hash(password)
@@ -21,8 +26,8 @@ def get_user(db: Session, user_id: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).order_by(User.created_at.asc()).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, cursor: str = None):
+    return paginate(db.query(User), [User.created_at, User.id], skip, limit, cursor).all()
 def create_user(db: Session, user: UserCreate):
     hashed_password = get_password_hash(user.password)
     db_user = User(
@@ -45,4 +50,44 @@ def authenticate_user(db: Session, email: str, password: str):
         return False
     if not verify_password(password, user.hashed_password):
         return False
-    return user
\ No newline at end of file
+    return user
+
+# Variantes asíncronas
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def get_users_async(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: str = None):
+    result = await db.execute(paginate(select(User), [User.created_at, User.id], skip, limit, cursor))
+    return result.scalars().all()
+
+async def create_user_async(db: AsyncSession, user: UserCreate):
+    # bcrypt se ejecuta en el pool de procesos para no bloquear el event loop
+    hashed_password = await hash_password_async(user.password)
+    db_user = User(
+        email=user.email,
+        nombre_Usuario=user.nombre_Usuario,
+        nombre=user.nombre,
+        extensión=user.extensión,
+        departamento_id=user.departamento_id,
+        role=user.role,
+        hashed_password=hashed_password
+    )
+    db.add(db_user)
+    # La restricción UNIQUE de email sustituye a la consulta previa
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if is_unique_violation(exc):
+            raise DuplicateEntry()
+        raise
+    return db_user
+
+async def authenticate_user_async(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email_async(db, email)
+    if not user:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
@@ -1,8 +1,19 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import os
+from db.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from db.instrumentation import instrument_engine
+from db.sqlite import (
+    SqliteReaderPool, SqliteWriterPool, apply_sqlite_pragmas, create_sqlite_engines, routing_session_class
+)
+
 
 
+# Motor de base de datos: "mssql" (SQL Server, por defecto) o "sqlite" (perfil WAL con
+# un escritor y un pool de lectura, ver db/sqlite.py; archivo en SQLITE_DATABASE_PATH)
+DB_BACKEND = os.getenv("DB_BACKEND", "mssql").lower()
 
 #Conexion Con Sql Sever  
 DATABASE_URL = (
@@ -11,17 +22,51 @@ DATABASE_URL = (
     "&trusted_connection=yes"
 )
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Misma base de datos a través de aioodbc para la ruta asíncrona
+ASYNC_DATABASE_URL = (
+    "mssql+aioodbc://TI-03\\MSSQLSERVERHILLA/ticked"
+    "?driver=ODBC+Driver+17+for+SQL+Server"
+    "&trusted_connection=yes"
+)
 
-Base = declarative_base()
+# Configuración del pool de conexiones (valores por variable de entorno)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": True,
+    "echo": DB_ECHO,
+}
 
 # Crear el motor de SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,  # Establecer en False en producción
-    pool_pre_ping=True
-)
+if DB_BACKEND == "sqlite":
+    from models.base import ASYNC_SQLALCHEMY_DATABASE_URL, SQLALCHEMY_DATABASE_URL
+    # Motor síncrono para scripts y rutas síncronas; espera el bloqueo con busy_timeout
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        connect_args={"check_same_thread": False},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        echo=DB_ECHO,
+    )
+    apply_sqlite_pragmas(engine)
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=InstrumentedQueuePool,
+        **POOL_OPTIONS
+    )
+
+instrument_engine(engine)
 
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -35,4 +80,46 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Motor y sesión asíncronos (no bloquean el event loop de FastAPI)
+if DB_BACKEND == "sqlite":
+    # async_engine es el escritor; las sesiones envían las lecturas a async_read_engine
+    async_engine, async_read_engine = create_sqlite_engines(ASYNC_SQLALCHEMY_DATABASE_URL, echo=DB_ECHO)
+    session_options = {"sync_session_class": routing_session_class(async_engine, async_read_engine)}
+else:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=InstrumentedAsyncQueuePool,
+        **POOL_OPTIONS
+    )
+    instrument_engine(async_engine.sync_engine)
+    async_read_engine = None
+    session_options = {}
+
+# expire_on_commit=False evita recargas perezosas (no permitidas en async) tras el commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+    **session_options
+)
+
+# Dependencia para obtener una sesión asíncrona
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Métricas del pool para el endpoint de administración
+def get_pool_metrics():
+    if DB_BACKEND == "sqlite":
+        return {
+            "sync": InstrumentedQueuePool.metrics.snapshot(engine.pool),
+            "sqlite_writer": SqliteWriterPool.metrics.snapshot(async_engine.sync_engine.pool),
+            "sqlite_reader": SqliteReaderPool.metrics.snapshot(async_read_engine.sync_engine.pool),
+        }
+    return {
+        "sync": InstrumentedQueuePool.metrics.snapshot(engine.pool),
+        "async": InstrumentedAsyncQueuePool.metrics.snapshot(async_engine.sync_engine.pool),
+    }
@@ -0,0 +1,98 @@
+# Instrumentación de SQL por petición: número de sentencias y tiempo en base de datos.
+# Los eventos del motor acumulan en el contexto de la petición actual (ContextVar), y
+# al terminar la petición se agregan por ruta para el endpoint /metrics.
+import time
+from contextvars import ContextVar
+from threading import Lock
+
+from sqlalchemy import event
+
+
+class RequestDbStats:
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+current_db_stats: ContextVar = ContextVar("current_db_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    stats = current_db_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+def _handle_error(exception_context):
+    # Evitar que una sentencia fallida deje un tiempo de inicio huérfano
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+def instrument_engine(engine):
+    # Acepta motores síncronos; para AsyncEngine usar async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class RouteMetrics:
+
+    def __init__(self):
+        self._lock = Lock()
+        self._routes = {}
+
+    def record(self, method: str, route: str, status_code: int, request_seconds: float, stats: RequestDbStats):
+        key = (method, route)
+        with self._lock:
+            entry = self._routes.get(key)
+            if entry is None:
+                entry = {"requests": 0, "errors": 0, "statements": 0, "db_seconds": 0.0, "request_seconds": 0.0}
+                self._routes[key] = entry
+            entry["requests"] += 1
+            if status_code >= 500:
+                entry["errors"] += 1
+            entry["statements"] += stats.statements
+            entry["db_seconds"] += stats.db_seconds
+            entry["request_seconds"] += request_seconds
+
+    def render_prometheus(self) -> str:
+        metrics = (
+            ("http_requests_total", "counter", "Peticiones atendidas por ruta", "requests"),
+            ("http_request_errors_total", "counter", "Respuestas 5xx por ruta", "errors"),
+            ("http_request_duration_seconds_total", "counter", "Tiempo total de respuesta por ruta", "request_seconds"),
+            ("db_statements_total", "counter", "Sentencias SQL ejecutadas por ruta", "statements"),
+            ("db_duration_seconds_total", "counter", "Tiempo total en base de datos por ruta", "db_seconds"),
+        )
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+            for name, metric_type, help_text, field in metrics:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for (method, route), entry in routes:
+                    labels = f'method="{method}",route="{_escape_label(route)}"'
+                    lines.append(f"{name}{{{labels}}} {entry[field]}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+route_metrics = RouteMetrics()
+
+
+def server_timing_header(stats: RequestDbStats, request_seconds: float) -> str:
+    return (
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statements} queries", '
+        f"total;dur={request_seconds * 1000:.2f}"
+    )
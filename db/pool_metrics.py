@@ -0,0 +1,86 @@
+# Métricas del pool de conexiones: checkouts, esperas, timeouts y un histograma
+# de la latencia de obtención de conexión (buckets en milisegundos).
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+CHECKOUT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.checkout_ms_sum = 0.0
+        # Un contador por bucket más el de +Inf
+        self.bucket_counts = [0] * (len(CHECKOUT_BUCKETS_MS) + 1)
+
+    def record_checkout(self, elapsed_ms: float, waited: bool):
+        with self._lock:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+            self.checkout_ms_sum += elapsed_ms
+            self.bucket_counts[bisect_left(CHECKOUT_BUCKETS_MS, elapsed_ms)] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool=None):
+        with self._lock:
+            cumulative = 0
+            histogram = {}
+            for bound, count in zip(CHECKOUT_BUCKETS_MS + ("+Inf",), self.bucket_counts):
+                cumulative += count
+                histogram[str(bound)] = cumulative
+            data = {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "checkout_ms_sum": round(self.checkout_ms_sum, 3),
+                "checkout_ms_histogram": histogram,
+            }
+        if pool is not None:
+            data.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+        return data
+
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+
+class _InstrumentedPoolMixin:
+    metrics = None
+
+    def _do_get(self):
+        # Habrá espera si no quedan conexiones libres ni margen de overflow
+        waited = self.checkedin() == 0 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout((time.perf_counter() - start) * 1000, waited)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics = sync_pool_metrics
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
@@ -0,0 +1,134 @@
+# Perfil SQLite para despliegues pequeños (sucursales, edge) con concurrencia real.
+# Con la configuración por defecto SQLite usa el diario rollback: un escritor bloquea a
+# los lectores y las escrituras simultáneas fallan con "database is locked". Aquí:
+#   - WAL: los lectores no bloquean al escritor ni al revés,
+#   - pragmas de synchronous/cache/mmap/busy_timeout aplicados en cada conexión,
+#   - un único escritor: pool de una conexión, las escrituras esperan turno en la cola
+#     del pool (SQLITE_WRITE_TIMEOUT) en lugar de competir por el bloqueo del archivo,
+#     y las transacciones de escritura empiezan con BEGIN IMMEDIATE,
+#   - un pool de conexiones de solo lectura para las consultas.
+# SqliteRoutingSession decide por sentencia qué motor usar.
+import os
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from db.instrumentation import instrument_engine
+from db.pool_metrics import InstrumentedAsyncQueuePool, PoolMetrics
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", str(min(8, os.cpu_count() or 2))))
+# Espera máxima en la cola del escritor antes de dar timeout
+SQLITE_WRITE_TIMEOUT = float(os.getenv("SQLITE_WRITE_TIMEOUT", "30"))
+
+
+def sqlite_pragmas(read_only: bool = False):
+    pragmas = [
+        f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        # Negativo: tamaño en KiB en lugar de páginas
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA foreign_keys=ON",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, read_only: bool = False, immediate: bool = False):
+    # Acepta motores síncronos; para AsyncEngine usar async_engine.sync_engine.
+    # immediate: el driver deja de abrir transacciones por su cuenta y cada transacción
+    # empieza con BEGIN IMMEDIATE (toma el bloqueo de escritura al inicio, no a mitad)
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if immediate:
+            dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    if immediate:
+        @event.listens_for(engine, "begin")
+        def _on_begin(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+class SqliteWriterPool(InstrumentedAsyncQueuePool):
+    metrics = PoolMetrics("sqlite_writer")
+
+
+class SqliteReaderPool(InstrumentedAsyncQueuePool):
+    metrics = PoolMetrics("sqlite_reader")
+
+
+def create_sqlite_engines(async_url: str, echo: bool = False):
+    # (escritor, lector) asíncronos sobre el mismo archivo
+    writer = create_async_engine(
+        async_url,
+        poolclass=SqliteWriterPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=SQLITE_WRITE_TIMEOUT,
+        echo=echo,
+    )
+    reader = create_async_engine(
+        async_url,
+        poolclass=SqliteReaderPool,
+        pool_size=SQLITE_READ_POOL_SIZE,
+        max_overflow=0,
+        echo=echo,
+    )
+    apply_sqlite_pragmas(writer.sync_engine, immediate=True)
+    apply_sqlite_pragmas(reader.sync_engine, read_only=True)
+    instrument_engine(writer.sync_engine)
+    instrument_engine(reader.sync_engine)
+    return writer, reader
+
+
+def _is_read(clause) -> bool:
+    if clause is None:
+        # session.connection() sin sentencia: puede venir de código que escribe
+        return False
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip().upper().startswith(("SELECT", "WITH"))
+    return getattr(clause, "is_select", False) and getattr(clause, "_for_update_arg", None) is None
+
+
+class SqliteRoutingSession(Session):
+    # Lecturas al pool de solo lectura; flush, DML y todo lo que siga a una escritura
+    # dentro de la misma transacción, al escritor (para leer lo que se acaba de escribir)
+    writer = None
+    reader = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or self.info.get("sqlite_writing") or not _is_read(clause):
+            self.info["sqlite_writing"] = True
+            return self.writer
+        return self.reader
+
+
+@event.listens_for(SqliteRoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("sqlite_writing", None)
+
+
+def routing_session_class(writer, reader):
+    # Subclase con los motores síncronos subyacentes, para async_sessionmaker(sync_session_class=...)
+    return type(
+        "SqliteRoutingSession",
+        (SqliteRoutingSession,),
+        {"writer": writer.sync_engine, "reader": reader.sync_engine},
+    )
@@ -1,15 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status, File, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import os
-import shutil
 from pathlib import Path
 from config import BaseModelWithConfig
-from database import get_db
+from database import AsyncSessionLocal, get_async_db, get_pool_metrics
 
 from schemas.schemas import (
     User, UserCreate, Token,
-    Ticket, TicketCreate, TicketUpdate,
+    Ticket, TicketCreate, TicketUpdate, TicketBulkUpdate, TicketBulkResult,
     Comment, CommentCreate,
     Department, DepartmentCreate,
     Categoria, CategoriaCreate,
@@ -17,19 +17,48 @@ from schemas.schemas import (
     Mensaje, MensajeCreate,
     Attachment, AttachmentCreate
 )
-from crud import users, tickets, comments, departments, categoria, mensaje, attachment
-from auth.jwt import create_access_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from crud import users, tickets, comments, departments, categoria, mensaje, attachment, search, stats
+from crud.change_feed import can_see, change_feed
+from crud.errors import DuplicateEntry
+from crud.pagination import InvalidCursor, next_cursor
+from crud.policy import ATTACH, COMMENT, UPDATE, Principal
+from crud.reference_cache import (
+    CATEGORIAS, CATEGORIA_DEPARTAMENTO, DEPARTMENTS, etag_matches, reference_cache
+)
+from auth.jwt import create_access_token, get_current_user, get_current_user_detached, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth.principal_cache import principal_cache
+from utils.security import PasswordHasherBusy, password_pool_stats, shutdown_password_pool
+from utils.files import ATTACHMENT_MAX_BYTES, InvalidRange, RangeFileResponse, UploadSizeLimitMiddleware, UploadTooLarge
+from utils.attachment_store import blob_lock, discard_upload, publish_blob, receive_upload, remove_blob
 from fastapi import Form
 from fastapi.security import OAuth2PasswordRequestForm
-from datetime import timedelta
+from datetime import datetime, timedelta
+import time
+import hashlib
+import asyncio
+import json
+from db.instrumentation import RequestDbStats, current_db_stats, route_metrics, server_timing_header
+from utils.serialization import ORJSONResponse, csv_chunks, dump_list, list_response, ndjson_chunks
+from utils.compression import CompressionMiddleware, PrecompressedPayload, precompressed_response
+from utils.rate_limit import (
+    AdmissionMiddleware, RateLimitExceeded, TokenBucketLimiter, client_ip, rate_limit_registry
+)
 
 # Crear la instancia de FastAPI
 app = FastAPI(
     title="Sistema de Tickets",
     description="API para gestionar tickets y solicitudes internas",
-    version="1.0.0"
+    version="1.0.0",
+    # El resto de respuestas JSON también se escriben con orjson
+    default_response_class=ORJSONResponse
 )
 
+# Descarte de carga: 429 cuando hay más de ADMISSION_MAX_PENDING peticiones en curso.
+# Se registra antes que CORS para que las respuestas rechazadas lleven sus cabeceras
+app.add_middleware(AdmissionMiddleware)
+# Subidas de adjuntos: 413 antes de que el formulario multipart se lea y se vuelque a disco
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Configuración CORS
 from fastapi.middleware.cors import CORSMiddleware
 app.add_middleware(
@@ -38,15 +67,130 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Range", "Accept-Ranges", "Server-Timing", "ETag"],
 )
+# Compresión gzip/brotli negociada por Accept-Encoding (umbral COMPRESSION_MIN_BYTES)
+app.add_middleware(CompressionMiddleware)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    shutdown_password_pool()
+
+# Instrumentación por petición: sentencias SQL y tiempo en base de datos
+@app.middleware("http")
+async def db_timing_middleware(request: Request, call_next):
+    stats = RequestDbStats()
+    token = current_db_stats.set(stats)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_db_stats.reset(token)
+    elapsed = time.perf_counter() - start
+    # Agregar por plantilla de ruta (no por URL) para acotar la cardinalidad
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else "unmatched"
+    route_metrics.record(request.method, route_path, response.status_code, elapsed, stats)
+    response.headers["Server-Timing"] = server_timing_header(stats, elapsed)
+    return response
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def read_metrics():
+    return PlainTextResponse(
+        route_metrics.render_prometheus() + rate_limit_registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+# Límites por ruta (cubo de fichas). Cada uno se puede cambiar con RATE_LIMIT_<NOMBRE>,
+# p. ej. RATE_LIMIT_LOGIN_IP="50/minute"; "N/periodo:ráfaga" fija una ráfaga distinta
+LOGIN_IP_LIMIT = TokenBucketLimiter("login_ip", "30/minute")
+LOGIN_EMAIL_LIMIT = TokenBucketLimiter("login_email", "5/minute:10")
+SIGNUP_IP_LIMIT = TokenBucketLimiter("signup_ip", "10/minute")
+WRITE_USER_LIMIT = TokenBucketLimiter("write_user", "120/minute:30")
+BULK_USER_LIMIT = TokenBucketLimiter("bulk_user", "10/minute:3")
+UPLOAD_USER_LIMIT = TokenBucketLimiter("upload_user", "30/minute:10")
+
+def limit_by_ip(limiter: TokenBucketLimiter):
+    async def dependency(request: Request):
+        limiter.hit(client_ip(request))
+    return dependency
+
+def limit_by_user(limiter: TokenBucketLimiter):
+    # get_current_user se resuelve una sola vez por petición (caché de dependencias)
+    async def dependency(current_user: User = Depends(get_current_user)):
+        limiter.hit(str(current_user.id))
+    return dependency
+
+def limit_by_login(limiter: TokenBucketLimiter):
+    # Por cuenta atacada, aunque los intentos lleguen desde muchas IP
+    async def dependency(form_data: OAuth2PasswordRequestForm = Depends()):
+        limiter.hit(form_data.username.strip().lower())
+    return dependency
+
+WRITE_LIMITS = [Depends(limit_by_user(WRITE_USER_LIMIT))]
+
+# Paginación por cursor: el token de la página siguiente viaja en una cabecera
+# para no cambiar la forma de las respuestas existentes
+def set_next_cursor(response: Response, items, fields, limit: int):
+    cursor = next_cursor(items, fields, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+
+# Peticiones condicionales: 304 si el cliente ya tiene la versión actual
+def compute_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{digest}"'
+
+def not_modified(request: Request, etag: str):
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+# La consulta autorizada no devolvió fila: 404 si no existe, 403 si existe sin permiso
+def access_denied(access, not_found: str, forbidden: str) -> HTTPException:
+    if access is False:
+        return HTTPException(status_code=403, detail=forbidden)
+    return HTTPException(status_code=404, detail=not_found)
+
+# El pool de bcrypt está saturado: pedir al cliente que reintente
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servidor ocupado, intente de nuevo en unos segundos"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Demasiadas peticiones, intente de nuevo más tarde"},
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+@app.exception_handler(tickets.UnsupportedTicketField)
+async def unsupported_ticket_field_handler(request: Request, exc: tickets.UnsupportedTicketField):
+    return JSONResponse(
+        status_code=400,
+        content={"detail": f"Campos no actualizables: {', '.join(exc.fields)}"}
+    )
+
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": "Cursor de paginación inválido"})
 
 # Endpoint de autenticación
-@app.post("/token", response_model=Token)
+@app.post(
+    "/token",
+    response_model=Token,
+    dependencies=[Depends(limit_by_ip(LOGIN_IP_LIMIT)), Depends(limit_by_login(LOGIN_EMAIL_LIMIT))]
+)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = users.authenticate_user(db, form_data.username, form_data.password)
+    user = await users.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,12 +204,12 @@ async def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 # Endpoints de usuarios
-@app.post("/users/", response_model=User)
-async def create_user_endpoint(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = users.get_user_by_email(db, email=user.email)
-    if db_user:
+@app.post("/users/", response_model=User, dependencies=[Depends(limit_by_ip(SIGNUP_IP_LIMIT))])
+async def create_user_endpoint(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await users.create_user_async(db=db, user=user)
+    except DuplicateEntry:
         raise HTTPException(status_code=400, detail="Email ya registrado")
-    return users.create_user(db=db, user=user)
 
 @app.get("/users/me/", response_model=User)
 async def read_users_me(
@@ -75,198 +219,508 @@ async def read_users_me(
 
 @app.get("/users/", response_model=List[User])
 async def read_users(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "administrador":
         raise HTTPException(status_code=403, detail="No tiene permisos para ver todos los usuarios")
-    return users.get_users(db, skip=skip, limit=limit)
+    result = await users.get_users_async(db, skip=skip, limit=limit, cursor=cursor)
+    set_next_cursor(response, result, users.USER_CURSOR_FIELDS, limit)
+    return list_response(User, result, response)
+
+@app.get("/admin/principal-cache")
+async def read_principal_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "administrador":
+        raise HTTPException(status_code=403, detail="No tiene permisos para ver las métricas de caché")
+    return principal_cache.stats()
+
+@app.get("/admin/password-pool")
+async def read_password_pool_stats(
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "administrador":
+        raise HTTPException(status_code=403, detail="No tiene permisos para ver las métricas del pool de contraseñas")
+    return password_pool_stats()
+
+@app.get("/admin/db-pool")
+async def read_db_pool_metrics(
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "administrador":
+        raise HTTPException(status_code=403, detail="No tiene permisos para ver las métricas del pool de conexiones")
+    return get_pool_metrics()
+
+@app.get("/admin/rate-limits")
+async def read_rate_limit_stats(
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "administrador":
+        raise HTTPException(status_code=403, detail="No tiene permisos para ver las métricas de límites de peticiones")
+    return rate_limit_registry.stats()
+
+@app.get("/admin/reference-cache")
+async def read_reference_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "administrador":
+        raise HTTPException(status_code=403, detail="No tiene permisos para ver las métricas de caché")
+    return reference_cache.stats()
 
 # Endpoints para Departamentos
 @app.get("/departments/", response_model=List[Department])
 async def read_departments(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return departments.get_departments(db, skip=skip, limit=limit)
+    etag = reference_cache.etag(DEPARTMENTS)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    # La entrada guarda también el JSON y sus versiones comprimidas
+    async def load():
+        return PrecompressedPayload(
+            await departments.get_departments_async(db, skip=skip, limit=limit, cursor=cursor)
+        )
+    
+    payload = await reference_cache.get_or_load((DEPARTMENTS,), ("list", skip, limit, cursor), load)
+    set_next_cursor(response, payload.items, departments.DEPARTMENT_CURSOR_FIELDS, limit)
+    response.headers["ETag"] = etag
+    return precompressed_response(request, response, payload, lambda items: dump_list(Department, items))
 
-@app.post("/departments/", response_model=Department)
+@app.post("/departments/", response_model=Department, dependencies=WRITE_LIMITS)
 async def create_department_endpoint(
     department: DepartmentCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role != "administrador":
         raise HTTPException(status_code=403, detail="No tiene permisos para crear departamentos")
     
-    db_department = departments.get_department_by_name(db, name=department.nombre)
-    if db_department:
+    try:
+        return await departments.create_department_async(db=db, department=department)
+    except DuplicateEntry:
         raise HTTPException(status_code=400, detail="Ya existe un departamento con ese nombre")
-    
-    return departments.create_department(db=db, department=department)
 
 # Endpoints para Tickets
-@app.post("/tickets/", response_model=Ticket)
+@app.post("/tickets/", response_model=Ticket, dependencies=WRITE_LIMITS)
 async def create_ticket_endpoint(
     ticket: TicketCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    return tickets.create_ticket(db=db, ticket=ticket, user_id=current_user.id)
+    return await tickets.create_ticket_async(db=db, ticket=ticket, user_id=current_user.id)
 
 @app.get("/tickets/", response_model=List[Ticket])
 async def read_tickets(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     status: Optional[str] = None,
     department: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    return tickets.get_tickets(
+    # Sonda barata (ids y fechas de la página, sin cargar filas ni relaciones)
+    principal = Principal.from_user(current_user)
+    version = await tickets.get_tickets_version_async(
+        db,
+        status=status,
+        departamento=department,
+        principal=principal,
+        skip=skip,
+        limit=limit,
+        cursor=cursor
+    )
+    etag = compute_etag(
+        "tickets", principal.user_id, principal.role, principal.departamento_id, skip, limit, cursor, status, department, *version
+    )
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    result = await tickets.get_tickets_async(
         db, 
         skip=skip, 
         limit=limit, 
         status=status,
-        department=department,
-        user_id=current_user.id,
-        role=current_user.role
+        departamento=department,
+        principal=principal,
+        cursor=cursor
+    )
+    set_next_cursor(response, result, tickets.TICKET_CURSOR_FIELDS, limit)
+    response.headers["ETag"] = etag
+    return list_response(Ticket, result, response)
+
+# Debe declararse antes de /tickets/{ticket_id} para que "search" no se tome como id
+@app.get("/tickets/search", response_model=List[Ticket])
+async def search_tickets_endpoint(
+    q: str,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if len(q.strip()) < 2:
+        raise HTTPException(status_code=400, detail="La búsqueda debe tener al menos 2 caracteres")
+    
+    result = await search.search_tickets_async(
+        db,
+        q,
+        principal=Principal.from_user(current_user),
+        limit=min(limit, 100)
+    )
+    return list_response(Ticket, result)
+
+# Exportación completa para informes; debe declararse antes de /tickets/{ticket_id}
+@app.get("/tickets/export")
+async def export_tickets(
+    format: str = "ndjson",
+    status: Optional[str] = None,
+    department: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user_detached)
+):
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Formato no soportado: use 'ndjson' o 'csv'")
+    principal = Principal.from_user(current_user)
+    
+    async def body():
+        # Sesión propia: debe seguir abierta mientras se envía la respuesta
+        async with AsyncSessionLocal() as db:
+            rows = tickets.stream_tickets_async(
+                db,
+                principal=principal,
+                status=status,
+                departamento=department,
+                since=since,
+                until=until
+            )
+            chunks = csv_chunks(rows, tickets.EXPORT_COLUMNS) if format == "csv" else ndjson_chunks(rows)
+            async for chunk in chunks:
+                yield chunk
+    
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tickets.{format}"'}
     )
 
 @app.get("/tickets/{ticket_id}", response_model=Ticket)
 async def read_ticket(
     ticket_id: str, 
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_ticket = tickets.get_ticket(db, ticket_id=ticket_id)
+    # La sonda de versión ya filtra por la política de acceso
+    principal = Principal.from_user(current_user)
+    ticket_version = await tickets.get_ticket_version_async(db, ticket_id=ticket_id, principal=principal)
+    if ticket_version is None:
+        access = await tickets.check_ticket_access_async(db, ticket_id, principal)
+        raise access_denied(access, "Ticket no encontrado", "No tiene permisos para ver este ticket")
+    
+    etag = compute_etag(
+        "ticket", ticket_id, ticket_version.updatedAt,
+        ticket_version.comment_count, ticket_version.last_comment_at
+    )
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    db_ticket = await tickets.get_ticket_async(db, ticket_id=ticket_id, principal=principal)
     if db_ticket is None:
         raise HTTPException(status_code=404, detail="Ticket no encontrado")
+    response.headers["ETag"] = etag
+    return db_ticket
+
+# Debe declararse antes de /tickets/{ticket_id} para que "bulk" no se tome como id
+@app.patch(
+    "/tickets/bulk",
+    response_model=TicketBulkResult,
+    dependencies=WRITE_LIMITS + [Depends(limit_by_user(BULK_USER_LIMIT))]
+)
+async def bulk_update_tickets_endpoint(
+    bulk: TicketBulkUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if (bulk.ids is None) == (bulk.filter is None):
+        raise HTTPException(status_code=400, detail="Debe indicar 'ids' o 'filter', pero no ambos")
     
-    # Verificar permisos
-    if current_user.role == "usuario" and db_ticket.requested_by != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para ver este ticket")
-    elif current_user.role == "soporte" and db_ticket.departamento_id != current_user.departamento_id and db_ticket.assigned_to != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para ver este ticket")
+    try:
+        updated, results = await tickets.bulk_update_tickets_async(
+            db,
+            bulk.update,
+            principal=Principal.from_user(current_user),
+            ticket_ids=bulk.ids,
+            filters=bulk.filter.dict() if bulk.filter else None
+        )
+    except tickets.BulkUpdateTooLarge:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La actualización masiva admite como máximo {tickets.BULK_UPDATE_MAX_TICKETS} tickets"
+        )
+    except tickets.EmptyBulkFilter:
+        raise HTTPException(status_code=400, detail="El filtro debe incluir al menos un criterio")
     
-    return db_ticket
+    return {
+        "updated": updated,
+        "results": [{"id": ticket_id, "result": result} for ticket_id, result in results]
+    }
 
-@app.patch("/tickets/{ticket_id}", response_model=Ticket)
+@app.patch("/tickets/{ticket_id}", response_model=Ticket, dependencies=WRITE_LIMITS)
 async def update_ticket_endpoint(
     ticket_id: str, 
     ticket_update: TicketUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_ticket = tickets.get_ticket(db, ticket_id=ticket_id)
+    # Se carga con sus comentarios: la misma instancia se actualiza y se devuelve
+    principal = Principal.from_user(current_user)
+    db_ticket = await tickets.get_ticket_async(
+        db, ticket_id=ticket_id, profile="list", principal=principal, action=UPDATE, for_update=True
+    )
     if db_ticket is None:
-        raise HTTPException(status_code=404, detail="Ticket no encontrado")
+        access = await tickets.check_ticket_access_async(db, ticket_id, principal, UPDATE)
+        raise access_denied(access, "Ticket no encontrado", "No tiene permisos para actualizar este ticket")
     
-    # Verificar permisos
-    if current_user.role == "usuario" and db_ticket.requested_by != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para actualizar este ticket")
-    
-    updated_ticket = tickets.update_ticket(db, ticket_id, ticket_update)
+    updated_ticket = await tickets.update_ticket_async(db, db_ticket, ticket_update)
     return updated_ticket
 
-@app.post("/tickets/{ticket_id}/comments/", response_model=Comment)
+@app.post("/tickets/{ticket_id}/comments/", response_model=Comment, dependencies=WRITE_LIMITS)
 async def create_comment_endpoint(
     ticket_id: str, 
     comment: CommentCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_ticket = tickets.get_ticket(db, ticket_id=ticket_id)
+    principal = Principal.from_user(current_user)
+    db_ticket = await tickets.get_ticket_async(
+        db, ticket_id=ticket_id, profile="minimal", principal=principal, action=COMMENT
+    )
     if db_ticket is None:
-        raise HTTPException(status_code=404, detail="Ticket no encontrado")
-    
-    # Verificar permisos
-    if current_user.role == "usuario" and db_ticket.requested_by != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para comentar en este ticket")
-    elif current_user.role == "soporte" and db_ticket.departamento_id != current_user.departamento_id and db_ticket.assigned_to != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para comentar en este ticket")
+        access = await tickets.check_ticket_access_async(db, ticket_id, principal, COMMENT)
+        raise access_denied(access, "Ticket no encontrado", "No tiene permisos para comentar en este ticket")
     
-    return tickets.add_comment(db, ticket_id, comment, current_user.id)
+    return await tickets.add_comment_async(db, ticket_id, comment, current_user.id)
+
+# Estadísticas de tickets (contadores mantenidos en cada escritura)
+@app.get("/stats/tickets")
+async def read_ticket_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "administrador":
+        raise HTTPException(status_code=403, detail="No tiene permisos para ver las estadísticas de tickets")
+    return await stats.get_ticket_stats_async(db)
+
+# Feed de cambios en tiempo real (Server-Sent Events)
+CHANGE_FEED_HEARTBEAT_SECONDS = 15
+
+def format_sse(event_id: str, event_type: str, data: dict) -> str:
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/events/stream")
+async def stream_events(
+    request: Request,
+    last_event_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user_detached)
+):
+    # El id de reanudación llega en la cabecera estándar de EventSource o como parámetro
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    subscriber = change_feed.subscribe(current_user)
+    
+    async def event_generator():
+        replayed_up_to = 0
+        try:
+            if resume_from:
+                missed, complete = change_feed.replay_since(resume_from)
+                if not complete:
+                    # Se perdieron eventos: el cliente debe recargar sus listados
+                    yield format_sse(change_feed.format_id(0), "reset", {})
+                for sequence, data in missed:
+                    if can_see(subscriber, data):
+                        yield format_sse(change_feed.format_id(sequence), data["type"], public_event(data))
+                # La suscripción es anterior a la repetición: lo publicado entre ambas
+                # está también en la cola y no debe enviarse dos veces
+                if missed:
+                    replayed_up_to = missed[-1][0]
+            while not await request.is_disconnected():
+                if subscriber.overflowed:
+                    yield format_sse(change_feed.format_id(0), "reset", {})
+                    break
+                try:
+                    sequence, data = await asyncio.wait_for(
+                        subscriber.queue.get(), timeout=CHANGE_FEED_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if sequence <= replayed_up_to:
+                    continue
+                if can_see(subscriber, data):
+                    yield format_sse(change_feed.format_id(sequence), data["type"], public_event(data))
+        finally:
+            change_feed.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def public_event(data: dict) -> dict:
+    # La audiencia es interna: al cliente solo se envían los identificadores
+    return {key: value for key, value in data.items() if key != "audience"}
+
+@app.get("/admin/change-feed")
+async def read_change_feed_stats(
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "administrador":
+        raise HTTPException(status_code=403, detail="No tiene permisos para ver las métricas del feed de cambios")
+    return change_feed.stats()
 
 # Endpoints para Categorías
-@app.post("/categorias/", response_model=Categoria)
+@app.post("/categorias/", response_model=Categoria, dependencies=WRITE_LIMITS)
 async def create_categoria_endpoint(
     categoria_data: CategoriaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verificar permisos (solo administradores pueden crear categorías)
     if current_user.role != "administrador":
         raise HTTPException(status_code=403, detail="No tiene permisos para crear categorías")
     
-    # Verificar si ya existe una categoría con el mismo nombre
-    db_categoria = categoria.get_categoria_by_nombre(db, nombre=categoria_data.nombre)
-    if db_categoria:
+    try:
+        return await categoria.create_categoria_async(db=db, categoria=categoria_data)
+    except DuplicateEntry:
         raise HTTPException(status_code=400, detail="Ya existe una categoría con ese nombre")
-    
-    return categoria.create_categoria(db=db, categoria=categoria_data)
 
 @app.get("/categorias/", response_model=List[Categoria])
 async def read_categorias(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    categorias = categoria.get_categorias(db, skip=skip, limit=limit)
-    return categorias
+    etag = reference_cache.etag(CATEGORIAS)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    # La entrada guarda también el JSON y sus versiones comprimidas
+    async def load():
+        return PrecompressedPayload(
+            await categoria.get_categorias_async(db, skip=skip, limit=limit, cursor=cursor)
+        )
+    
+    payload = await reference_cache.get_or_load((CATEGORIAS,), ("list", skip, limit, cursor), load)
+    set_next_cursor(response, payload.items, categoria.CATEGORIA_CURSOR_FIELDS, limit)
+    response.headers["ETag"] = etag
+    return precompressed_response(request, response, payload, lambda items: dump_list(Categoria, items))
 
 @app.get("/categorias/{categoria_id}", response_model=Categoria)
 async def read_categoria(
     categoria_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_categoria = categoria.get_categoria(db, categoria_id=categoria_id)
+    etag = reference_cache.etag(CATEGORIAS)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    db_categoria = await reference_cache.get_or_load(
+        (CATEGORIAS,),
+        ("detail", categoria_id),
+        lambda: categoria.get_categoria_async(db, categoria_id=categoria_id)
+    )
     if db_categoria is None:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    response.headers["ETag"] = etag
     return db_categoria
 
-@app.put("/categorias/{categoria_id}", response_model=Categoria)
+@app.get("/categorias/{categoria_id}/departamentos", response_model=List[Department])
+async def read_departamentos_by_categoria(
+    categoria_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    namespaces = (CATEGORIA_DEPARTAMENTO, CATEGORIAS, DEPARTMENTS)
+    etag = reference_cache.etag(*namespaces)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    
+    result = await reference_cache.get_or_load(
+        namespaces,
+        ("by_categoria", categoria_id),
+        lambda: categoria.get_departamentos_by_categoria_async(db, categoria_id=categoria_id)
+    )
+    response.headers["ETag"] = etag
+    return list_response(Department, result, response)
+
+@app.put("/categorias/{categoria_id}", response_model=Categoria, dependencies=WRITE_LIMITS)
 async def update_categoria_endpoint(
     categoria_id: str,
     categoria_data: CategoriaCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verificar permisos
     if current_user.role != "administrador":
         raise HTTPException(status_code=403, detail="No tiene permisos para actualizar categorías")
     
-    db_categoria = categoria.get_categoria(db, categoria_id=categoria_id)
+    try:
+        db_categoria = await categoria.update_categoria_async(db=db, categoria_id=categoria_id, nombre=categoria_data.nombre)
+    except DuplicateEntry:
+        raise HTTPException(status_code=400, detail="Ya existe una categoría con ese nombre")
     if db_categoria is None:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
-    
-    return categoria.update_categoria(db=db, categoria_id=categoria_id, nombre=categoria_data.nombre)
+    return db_categoria
 
-@app.delete("/categorias/{categoria_id}", response_model=Categoria)
+@app.delete("/categorias/{categoria_id}", response_model=Categoria, dependencies=WRITE_LIMITS)
 async def delete_categoria_endpoint(
     categoria_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verificar permisos
     if current_user.role != "administrador":
         raise HTTPException(status_code=403, detail="No tiene permisos para eliminar categorías")
     
-    db_categoria = categoria.get_categoria(db, categoria_id=categoria_id)
+    db_categoria = await categoria.get_categoria_async(db, categoria_id=categoria_id)
     if db_categoria is None:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
     
-    return categoria.delete_categoria(db=db, categoria_id=categoria_id)
+    return await categoria.delete_categoria_async(db=db, db_categoria=db_categoria)
 
 # Endpoints para asignar categorías a departamentos
-@app.post("/categorias/{categoria_id}/departamentos/{departamento_id}")
+@app.post("/categorias/{categoria_id}/departamentos/{departamento_id}", dependencies=WRITE_LIMITS)
 async def assign_categoria_to_departamento_endpoint(
     categoria_id: str,
     departamento_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verificar permisos
@@ -274,219 +728,268 @@ async def assign_categoria_to_departamento_endpoint(
         raise HTTPException(status_code=403, detail="No tiene permisos para asignar categorías a departamentos")
     
     # Verificar que existan la categoría y el departamento
-    db_categoria = categoria.get_categoria(db, categoria_id=categoria_id)
+    db_categoria = await categoria.get_categoria_async(db, categoria_id=categoria_id)
     if db_categoria is None:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
     
-    db_departamento = departments.get_department(db, department_id=departamento_id)
+    db_departamento = await departments.get_department_async(db, department_id=departamento_id)
     if db_departamento is None:
         raise HTTPException(status_code=404, detail="Departamento no encontrado")
     
-    result = categoria.assign_categoria_to_departamento(db, categoria_id, departamento_id)
+    result = await categoria.assign_categoria_to_departamento_async(db, categoria_id, departamento_id)
     if result:
         return {"message": "Categoría asignada al departamento correctamente"}
     else:
         return {"message": "La categoría ya estaba asignada al departamento"}
 
-@app.delete("/categorias/{categoria_id}/departamentos/{departamento_id}")
+@app.delete("/categorias/{categoria_id}/departamentos/{departamento_id}", dependencies=WRITE_LIMITS)
 async def remove_categoria_from_departamento_endpoint(
     categoria_id: str,
     departamento_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verificar permisos
     if current_user.role != "administrador":
         raise HTTPException(status_code=403, detail="No tiene permisos para desasignar categorías de departamentos")
     
-    result = categoria.remove_categoria_from_departamento(db, categoria_id, departamento_id)
+    result = await categoria.remove_categoria_from_departamento_async(db, categoria_id, departamento_id)
     if result:
         return {"message": "Categoría desasignada del departamento correctamente"}
     else:
         return {"message": "La categoría no estaba asignada al departamento"}
 
 # Endpoints para Mensajes
-@app.post("/mensajes/", response_model=Mensaje)
+@app.post("/mensajes/", response_model=Mensaje, dependencies=WRITE_LIMITS)
 async def create_mensaje_endpoint(
     mensaje_data: MensajeCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Opcional: Verificar que el usuario solo pueda crear mensajes propios
     if current_user.role != "administrador" and mensaje_data.users_id != current_user.id:
         mensaje_data.users_id = current_user.id
     
-    return mensaje.create_mensaje(db=db, mensaje=mensaje_data)
+    return await mensaje.create_mensaje_async(db=db, mensaje=mensaje_data)
 
 @app.get("/mensajes/", response_model=List[Mensaje])
 async def read_mensajes(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     user_id: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Si se especifica un user_id y el usuario actual no es administrador,
-    # solo permitir ver mensajes propios
-    if user_id and current_user.role != "administrador" and user_id != current_user.id:
-        user_id = current_user.id
-    
-    if user_id:
-        mensajes = mensaje.get_mensajes_by_user(db, user_id=user_id, skip=skip, limit=limit)
-    else:
-        # Si el usuario no es administrador, solo mostrar sus mensajes
-        if current_user.role != "administrador":
-            mensajes = mensaje.get_mensajes_by_user(db, user_id=current_user.id, skip=skip, limit=limit)
-        else:
-            mensajes = mensaje.get_mensajes(db, skip=skip, limit=limit)
+    # La política limita a los no administradores a sus propios mensajes
+    mensajes = await mensaje.get_mensajes_async(
+        db,
+        skip=skip,
+        limit=limit,
+        cursor=cursor,
+        user_id=user_id,
+        principal=Principal.from_user(current_user)
+    )
     
-    return mensajes
+    set_next_cursor(response, mensajes, mensaje.MENSAJE_CURSOR_FIELDS, limit)
+    return list_response(Mensaje, mensajes, response)
 
 @app.get("/mensajes/{mensaje_id}", response_model=Mensaje)
 async def read_mensaje(
     mensaje_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_mensaje = mensaje.get_mensaje(db, mensaje_id=mensaje_id)
+    principal = Principal.from_user(current_user)
+    db_mensaje = await mensaje.get_mensaje_async(db, mensaje_id=mensaje_id, principal=principal)
     if db_mensaje is None:
-        raise HTTPException(status_code=404, detail="Mensaje no encontrado")
-    
-    # Verificar permisos
-    if current_user.role != "administrador" and db_mensaje.users_id != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para ver este mensaje")
+        access = await mensaje.check_mensaje_access_async(db, mensaje_id, principal)
+        raise access_denied(access, "Mensaje no encontrado", "No tiene permisos para ver este mensaje")
     
     return db_mensaje
 
-@app.put("/mensajes/{mensaje_id}", response_model=Mensaje)
+@app.put("/mensajes/{mensaje_id}", response_model=Mensaje, dependencies=WRITE_LIMITS)
 async def update_mensaje_endpoint(
     mensaje_id: str,
     mensaje_text: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_mensaje = mensaje.get_mensaje(db, mensaje_id=mensaje_id)
+    principal = Principal.from_user(current_user)
+    db_mensaje = await mensaje.get_mensaje_async(db, mensaje_id=mensaje_id, principal=principal)
     if db_mensaje is None:
-        raise HTTPException(status_code=404, detail="Mensaje no encontrado")
+        access = await mensaje.check_mensaje_access_async(db, mensaje_id, principal)
+        raise access_denied(access, "Mensaje no encontrado", "No tiene permisos para actualizar este mensaje")
     
-    # Verificar permisos
-    if current_user.role != "administrador" and db_mensaje.users_id != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para actualizar este mensaje")
-    
-    return mensaje.update_mensaje(db=db, mensaje_id=mensaje_id, mensaje_text=mensaje_text)
+    return await mensaje.update_mensaje_async(db=db, db_mensaje=db_mensaje, mensaje_text=mensaje_text)
 
-@app.delete("/mensajes/{mensaje_id}", response_model=Mensaje)
+@app.delete("/mensajes/{mensaje_id}", response_model=Mensaje, dependencies=WRITE_LIMITS)
 async def delete_mensaje_endpoint(
     mensaje_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_mensaje = mensaje.get_mensaje(db, mensaje_id=mensaje_id)
+    principal = Principal.from_user(current_user)
+    db_mensaje = await mensaje.get_mensaje_async(db, mensaje_id=mensaje_id, principal=principal)
     if db_mensaje is None:
-        raise HTTPException(status_code=404, detail="Mensaje no encontrado")
-    
-    # Verificar permisos
-    if current_user.role != "administrador" and db_mensaje.users_id != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para eliminar este mensaje")
+        access = await mensaje.check_mensaje_access_async(db, mensaje_id, principal)
+        raise access_denied(access, "Mensaje no encontrado", "No tiene permisos para eliminar este mensaje")
     
-    return mensaje.delete_mensaje(db=db, mensaje_id=mensaje_id)
+    return await mensaje.delete_mensaje_async(db=db, db_mensaje=db_mensaje)
 
 # Endpoints para Attachments (archivos adjuntos)
-@app.post("/attachments/", response_model=Attachment)
+@app.post(
+    "/attachments/",
+    response_model=Attachment,
+    dependencies=WRITE_LIMITS + [Depends(limit_by_user(UPLOAD_USER_LIMIT))]
+)
 async def create_attachment_endpoint(
     file: UploadFile = File(...),
     ticket_id: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Verificar que el ticket existe
-    db_ticket = tickets.get_ticket(db, ticket_id=ticket_id)
+    # Verificar que el ticket existe y que se puede adjuntar en una sola consulta
+    principal = Principal.from_user(current_user)
+    db_ticket = await tickets.get_ticket_async(
+        db, ticket_id=ticket_id, profile="minimal", principal=principal, action=ATTACH
+    )
     if db_ticket is None:
-        raise HTTPException(status_code=404, detail="Ticket no encontrado")
-    
-    # Verificar permisos
-    if current_user.role != "administrador" and db_ticket.requested_by != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para adjuntar archivos a este ticket")
+        access = await tickets.check_ticket_access_async(db, ticket_id, principal, ATTACH)
+        raise access_denied(access, "Ticket no encontrado", "No tiene permisos para adjuntar archivos a este ticket")
     
-    # Crear directorio para archivos si no existe
-    upload_dir = Path("uploads") / ticket_id
-    upload_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Guardar el archivo
-    file_path = upload_dir / file.filename
-    with file_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Guardar el archivo por bloques con tamaño limitado, calculando su hash
+    file_name = Path(file.filename).name
+    try:
+        tmp_path, content_hash, file_size = await receive_upload(file, max_bytes=ATTACHMENT_MAX_BYTES)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El archivo supera el tamaño máximo permitido ({ATTACHMENT_MAX_BYTES} bytes)"
+        )
     
     # Obtener extensión del archivo
-    file_extension = os.path.splitext(file.filename)[1].lstrip(".")
-    
-    # Crear registro en la base de datos
-    attachment_data = AttachmentCreate(
-        file_name=file.filename,
-        file_path=str(file_path),
-        file_extension=file_extension,
-        ticket_id=ticket_id
-    )
-    
-    return attachment.create_attachment(db=db, attachment=attachment_data)
+    file_extension = os.path.splitext(file_name)[1].lstrip(".")
+    
+    # Publicar el blob (solo se escribe si el contenido es nuevo) y crear el registro
+    async with blob_lock(content_hash):
+        try:
+            file_path = await publish_blob(tmp_path, content_hash)
+        except BaseException:
+            await discard_upload(tmp_path)
+            raise
+        attachment_data = AttachmentCreate(
+            file_name=file_name,
+            file_path=str(file_path),
+            file_extension=file_extension,
+            ticket_id=ticket_id,
+            content_hash=content_hash,
+            file_size=file_size
+        )
+        try:
+            return await attachment.create_attachment_async(db=db, attachment=attachment_data)
+        except BaseException:
+            # No dejar blobs huérfanos si el registro no llegó a guardarse
+            await db.rollback()
+            if await attachment.count_attachments_by_hash_async(db, content_hash) == 0:
+                await remove_blob(content_hash)
+            raise
 
 @app.get("/attachments/ticket/{ticket_id}", response_model=List[Attachment])
 async def read_attachments_by_ticket(
     ticket_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Verificar que el ticket existe
-    db_ticket = tickets.get_ticket(db, ticket_id=ticket_id)
-    if db_ticket is None:
-        raise HTTPException(status_code=404, detail="Ticket no encontrado")
-    
-    # Verificar permisos
-    if current_user.role == "usuario" and db_ticket.requested_by != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para ver los adjuntos de este ticket")
+    principal = Principal.from_user(current_user)
+    result = await attachment.get_attachments_by_ticket_async(db, ticket_id=ticket_id, principal=principal)
+    if result:
+        return list_response(Attachment, result)
     
-    return attachment.get_attachments_by_ticket(db, ticket_id=ticket_id)
+    # Sin filas: ticket sin adjuntos, inexistente o no visible
+    access = await tickets.check_ticket_access_async(db, ticket_id, principal)
+    if access:
+        return list_response(Attachment, result)
+    raise access_denied(access, "Ticket no encontrado", "No tiene permisos para ver los adjuntos de este ticket")
 
 @app.get("/attachments/{attachment_id}", response_model=Attachment)
 async def read_attachment(
     attachment_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_attachment = attachment.get_attachment(db, attachment_id=attachment_id)
+    principal = Principal.from_user(current_user)
+    db_attachment = await attachment.get_attachment_async(
+        db, attachment_id=attachment_id, principal=principal
+    )
     if db_attachment is None:
-        raise HTTPException(status_code=404, detail="Archivo adjunto no encontrado")
-    
-    # Verificar permisos
-    db_ticket = tickets.get_ticket(db, ticket_id=db_attachment.ticket_id)
-    if current_user.role == "usuario" and db_ticket.requested_by != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para ver este archivo adjunto")
+        access = await attachment.check_attachment_access_async(db, attachment_id, principal)
+        raise access_denied(access, "Archivo adjunto no encontrado", "No tiene permisos para ver este archivo adjunto")
     
     return db_attachment
 
-@app.delete("/attachments/{attachment_id}", response_model=Attachment)
-async def delete_attachment_endpoint(
+@app.get("/attachments/{attachment_id}/content")
+async def read_attachment_content(
     attachment_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_attachment = attachment.get_attachment(db, attachment_id=attachment_id)
+    principal = Principal.from_user(current_user)
+    db_attachment = await attachment.get_attachment_async(
+        db, attachment_id=attachment_id, principal=principal
+    )
     if db_attachment is None:
-        raise HTTPException(status_code=404, detail="Archivo adjunto no encontrado")
-    
-    # Verificar permisos
-    db_ticket = tickets.get_ticket(db, ticket_id=db_attachment.ticket_id)
-    if current_user.role != "administrador" and db_ticket.requested_by != current_user.id:
-        raise HTTPException(status_code=403, detail="No tiene permisos para eliminar este archivo adjunto")
+        access = await attachment.check_attachment_access_async(db, attachment_id, principal)
+        raise access_denied(access, "Archivo adjunto no encontrado", "No tiene permisos para ver este archivo adjunto")
     
-    # Eliminar el archivo físico
     try:
-        os.remove(db_attachment.file_path)
-    except OSError:
-        # Si el archivo no existe, continuamos con la eliminación del registro
-        pass
-    
-    return attachment.delete_attachment(db=db, attachment_id=attachment_id)
+        return RangeFileResponse(
+            db_attachment.file_path,
+            range_header=request.headers.get("range"),
+            filename=db_attachment.file_name
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="El archivo adjunto no existe en el almacenamiento")
+    except InvalidRange:
+        size = os.path.getsize(db_attachment.file_path)
+        raise HTTPException(
+            status_code=416,
+            detail="Rango solicitado no válido",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+@app.delete("/attachments/{attachment_id}", response_model=Attachment, dependencies=WRITE_LIMITS)
+async def delete_attachment_endpoint(
+    attachment_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    principal = Principal.from_user(current_user)
+    db_attachment = await attachment.get_attachment_async(
+        db, attachment_id=attachment_id, principal=principal, action=ATTACH
+    )
+    if db_attachment is None:
+        access = await attachment.check_attachment_access_async(db, attachment_id, principal, ATTACH)
+        raise access_denied(access, "Archivo adjunto no encontrado", "No tiene permisos para eliminar este archivo adjunto")
+    
+    # Adjuntos anteriores al almacén por contenido: el archivo es exclusivo de la fila
+    if not db_attachment.content_hash:
+        try:
+            os.remove(db_attachment.file_path)
+        except OSError:
+            # Si el archivo no existe, continuamos con la eliminación del registro
+            pass
+        return await attachment.delete_attachment_async(db=db, db_attachment=db_attachment)
+    
+    # El blob compartido solo se elimina cuando desaparece la última referencia
+    content_hash = db_attachment.content_hash
+    async with blob_lock(content_hash):
+        deleted = await attachment.delete_attachment_async(db=db, db_attachment=db_attachment)
+        if await attachment.count_attachments_by_hash_async(db, content_hash) == 0:
+            await remove_blob(content_hash)
+    return deleted
 
 # Punto de entrada para ejecutar la aplicación
 if __name__ == "__main__":
@@ -4,15 +4,23 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from db.sqlite import apply_sqlite_pragmas
+
 # Configuración para SQLite (para desarrollo)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, 'ticket_system.db')}"
+# Ruta configurable para bases de prueba (p. ej. scripts/benchmark.py)
+SQLITE_DATABASE_PATH = os.getenv("SQLITE_DATABASE_PATH", os.path.join(BASE_DIR, 'ticket_system.db'))
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{SQLITE_DATABASE_PATH}"
+# Misma base a través de aiosqlite para la ruta asíncrona de la API
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{SQLITE_DATABASE_PATH}"
 
 # Crear el motor de SQLAlchemy
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False}  # Solo necesario para SQLite
 )
+# WAL y pragmas de db/sqlite.py también para los scripts (carga de datos, esquema)
+apply_sqlite_pragmas(engine)
 
 # Crear la sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
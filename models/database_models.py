@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text, Index
+from sqlalchemy.orm import relationship, synonym
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import Integer, String, ForeignKey
@@ -30,25 +30,42 @@ class User(Base):
     email = Column(String(255), unique=True, nullable=False)
     extensión = Column(String(50), nullable=True)
     nombre = Column(String(255), nullable=False)
-    departamento_id = Column(String(36), ForeignKey("Departamentos.id"))  
+    departamento_id = Column(String(36), ForeignKey("departments.id"))
     role = Column(String(20), nullable=False)
     hashed_password = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relaciones
-    tickets_created = relationship("Ticket", back_populates="requester", foreign_keys="Ticket.requested_by")
+    tickets_created = relationship("Ticket", back_populates="requester", foreign_keys="Ticket.user_id")
     tickets_assigned = relationship("Ticket", back_populates="assignee", foreign_keys="Ticket.assigned_to")
     comments = relationship("Comment", back_populates="user")
     departamento_rel = relationship("Department", back_populates="users")
+    mensajes = relationship("Mensaje", back_populates="user")
+
+    # Índice para la paginación por cursor de GET /users/
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
 class Comment(Base):
     __tablename__ = 'comments'
     
-    id: Mapped[str] = mapped_column(primary_key=True, index=True)  # Ajusta según tipo de id
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, index=True, default=generate_uuid)
     content: Mapped[str]  # Usa Mapped[] en lugar de solo str
-    ticket_id: Mapped[int]
-    user_id: Mapped[str]  # O el tipo adecuado para el user_id
-    created_at: Mapped[datetime]
+    ticket_id: Mapped[str] = mapped_column(String(36), ForeignKey("ticket.id"))
+    user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"))
+    # Valores generados en Python: el objeto devuelto tras el INSERT ya los tiene
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+
+    # Relaciones
+    ticket: Mapped["Ticket"] = relationship("Ticket", back_populates="comments")
+    user: Mapped["User"] = relationship("User", back_populates="comments")
+
+    # Comentarios de una página de tickets (selectinload con IN) y sondas de versión
+    # (count y max(created_at) por ticket) resueltas solo con el índice
+    __table_args__ = (
+        Index("ix_comments_ticket_id_created_at", "ticket_id", "created_at"),
+    )
 # Tabla de tickets (actualizada con nuevas relaciones)
 class Ticket(Base):
     __tablename__ = "ticket"
@@ -65,6 +82,12 @@ class Ticket(Base):
     createdAt = Column(DateTime, default=datetime.utcnow)
     updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Nombres del esquema de respuesta (schemas.Ticket) sobre las columnas existentes
+    description = synonym("descripcion")
+    requested_by = synonym("user_id")
+    created_at = synonym("createdAt")
+    updated_at = synonym("updatedAt")
+
     # Relaciones
     requester = relationship("User", back_populates="tickets_created", foreign_keys=[user_id])
     assignee = relationship("User", back_populates="tickets_assigned", foreign_keys=[assigned_to])
@@ -74,6 +97,31 @@ class Ticket(Base):
     mensaje = relationship("Mensaje", back_populates="tickets")
     attachments = relationship("Attachment", back_populates="ticket", cascade="all, delete-orphan")
 
+    # Índices para la paginación por cursor de GET /tickets/ y la exportación: cada filtro
+    # (status, departamento) y cada predicado de rol (propios, departamento, asignados)
+    # va seguido de (createdAt, id), así el filtro y el ORDER BY ... LIMIT usan el mismo índice
+    __table_args__ = (
+        Index("ix_ticket_createdAt_id", "createdAt", "id"),
+        Index("ix_ticket_status_createdAt_id", "status", "createdAt", "id"),
+        Index("ix_ticket_departamento_id_createdAt_id", "departamento_id", "createdAt", "id"),
+        Index("ix_ticket_user_id_createdAt_id", "user_id", "createdAt", "id"),
+        Index("ix_ticket_assigned_to_createdAt_id", "assigned_to", "createdAt", "id"),
+    )
+
+
+# Tabla de departamentos
+class Department(Base):
+    __tablename__ = "departments"
+
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    nombre = Column(String(255), nullable=False, unique=True)
+    create_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relaciones
+    users = relationship("User", back_populates="departamento_rel")
+    tickets = relationship("Ticket", back_populates="department_rel")
+    categorias = relationship("Categoria", secondary="CategoriaDepartamento", back_populates="departamentos")
+
 
 # Tabla de categorías
 class Categoria(Base):
@@ -105,6 +153,22 @@ class Mensaje(Base):
 
     # Relaciones
     user = relationship("User", back_populates="mensajes")
+    tickets = relationship("Ticket", back_populates="mensaje")
+
+    # Índices para la paginación por cursor de GET /mensajes/ (todos y por usuario)
+    __table_args__ = (
+        Index("ix_mensage_createdAt_id", "createdAt", "id"),
+        Index("ix_mensage_users_id_createdAt_id", "users_id", "createdAt", "id"),
+    )
+
+# Contadores de tickets por dimensión (status, departamento_id, categoria_id, assigned_to),
+# mantenidos en la misma transacción que cada escritura de Ticket (crud/stats.py)
+class TicketStat(Base):
+    __tablename__ = "ticket_stats"
+
+    dimension = Column(String(30), primary_key=True)
+    value = Column(String(36), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
 
 class MyBaseModel(BaseModel):
     model_config = {
@@ -125,14 +189,26 @@ class CommentResponse(CommentBase):
 
     class Config:
         orm_mode = True
-        
-        
+
+
+# Tabla de archivos adjuntos
+# file_path apunta al blob direccionado por contenido; varias filas pueden compartir
+# el mismo content_hash y el blob solo se borra cuando desaparece la última referencia.
+class Attachment(Base):
     __tablename__ = "attachements"
 
-    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=generate_uuid)
     file_name: Mapped[str] = mapped_column(String(255), nullable=False)
     file_path: Mapped[str] = mapped_column(String(512), nullable=False)
-    file_extension: Mapped[str] = mapped_column(String(10))
-    ticket_id: Mapped[int] = mapped_column(ForeignKey("tickets.id"))
+    file_extension: Mapped[str] = mapped_column(String(10), nullable=True)
+    ticket_id: Mapped[str] = mapped_column(String(36), ForeignKey("ticket.id"))
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=True)
+    file_size: Mapped[int] = mapped_column(Integer, nullable=True)
     # Relaciones
-    ticket: Mapped["Ticket"] = relationship("Ticket", back_populates="comments")
+    ticket: Mapped["Ticket"] = relationship("Ticket", back_populates="attachments")
+
+    # Índices para contar referencias a un mismo blob y para los adjuntos de un ticket
+    __table_args__ = (
+        Index("ix_attachements_content_hash", "content_hash"),
+        Index("ix_attachements_ticket_id", "ticket_id"),
+    )
@@ -5,12 +5,12 @@ from datetime import datetime
 from sqlalchemy.orm import Mapped
 from pydantic import BaseModel, Field, EmailStr
 from pydantic import BaseModel
-from models.schemas import BaseModelWithConfig
+from config import BaseModelWithConfig
 
 
 # Configuración base para Pydantic V2
 class MyModel(BaseModel):
-    id: Mapped[int]
+    id: int
     class Config:
         from_attributes = True 
 # Esquemas para Usuario
@@ -103,10 +103,14 @@ class AttachmentBase(BaseModel):
 
 class AttachmentCreate(AttachmentBase):
     ticket_id: str
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
 
 class Attachment(AttachmentBase):
     id: UUID
     ticket_id: str
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
 
 # Esquemas para Ticket
 class TicketBase(BaseModel):
@@ -127,6 +131,9 @@ class TicketUpdate(BaseModel):
 
 class Ticket(TicketBase):
     id: UUID
+    # La tabla ticket no guarda prioridad y la descripción puede faltar
+    description: Optional[str] = None
+    priority: Optional[str] = None
     status: str
     requested_by: str
     assigned_to: Optional[str] = None
@@ -5,11 +5,11 @@ from sqlalchemy.orm import Mapped
 from typing import List, Optional
 from datetime import datetime
 
-from models.schemas import BaseModelWithConfig
+from config import BaseModelWithConfig
 
 # Configuración base para Pydantic V2
 class MyModel(BaseModel):
-    id: Mapped[int]
+    id: int
     class Config:
         from_attributes = True 
 
@@ -104,10 +104,14 @@ class AttachmentBase(BaseModel):
 
 class AttachmentCreate(AttachmentBase):
     ticket_id: str
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
 
 class Attachment(AttachmentBase):
     id: UUID
     ticket_id: str
+    content_hash: Optional[str] = None
+    file_size: Optional[int] = None
 
 # Esquemas para Ticket
 class TicketBase(BaseModel):
@@ -126,8 +130,30 @@ class TicketUpdate(BaseModel):
     status: Optional[str] = Field(None, pattern="^(abierto|en progreso|en espera|resuelto|cerrado)$")
     assigned_to: Optional[str] = None
 
+# Esquemas para actualización masiva de tickets
+class TicketBulkFilter(BaseModel):
+    status: Optional[str] = None
+    departamento_id: Optional[str] = None
+    assigned_to: Optional[str] = None
+
+class TicketBulkUpdate(BaseModel):
+    ids: Optional[List[str]] = None
+    filter: Optional[TicketBulkFilter] = None
+    update: TicketUpdate
+
+class TicketBulkItemResult(BaseModel):
+    id: str
+    result: str  # actualizado, no_encontrado, sin_permiso
+
+class TicketBulkResult(BaseModel):
+    updated: int
+    results: List[TicketBulkItemResult]
+
 class Ticket(TicketBase):
     id: UUID
+    # La tabla ticket no guarda prioridad y la descripción puede faltar
+    description: Optional[str] = None
+    priority: Optional[str] = None
     status: str
     requested_by: str
     assigned_to: Optional[str] = None
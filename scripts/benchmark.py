@@ -0,0 +1,412 @@
+# Benchmark HTTP repetible de la API contra la base SQLite de desarrollo (models/base.py).
+# Carga datos con scripts.seed_data, arranca la aplicación en un proceso aparte y lanza
+# los escenarios (login, listado, detalle, alta, comentario, adjunto) con la
+# concurrencia indicada. El resultado (p50/p95/p99 y peticiones/s por endpoint) se
+# escribe en JSON con claves ordenadas para poder compararlo entre versiones.
+# Uso:
+#   python -m scripts.benchmark run --concurrency 32 --duration 30 --output bench.json
+#   python -m scripts.benchmark compare antes.json despues.json
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+# scripts.seed_data importa los modelos y con ellos database.py, que crea los motores al
+# importarse: el benchmark mide siempre el perfil SQLite, también en el proceso principal
+os.environ.setdefault("DB_BACKEND", "sqlite")
+
+from scripts.seed_data import SEED_PASSWORD  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB_PATH = ROOT / "benchmark.db"
+
+# Peso de cada escenario en la mezcla (se puede cambiar con --mix)
+DEFAULT_MIX = "list=40,detail=30,create=8,comment=12,attachment=5,login=5"
+# Reparto de roles entre los usuarios virtuales
+ROLE_SHARES = {"usuario": 0.7, "soporte": 0.2, "administrador": 0.1}
+ATTACHMENT_BYTES = 16 * 1024
+
+
+# --- Servidor ------------------------------------------------------------------
+
+def serve(args):
+    # Se ejecuta en el proceso hijo; DB_BACKEND=sqlite y SQLITE_DATABASE_PATH ya apuntan a la
+    # base de prueba, así se mide el perfil SQLite de database.py (WAL, escritor único)
+    import uvicorn
+
+    from main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def start_server(env, port: int, timeout: float = 60.0):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "scripts.benchmark", "serve", "--port", str(port)],
+        cwd=ROOT,
+        env=env,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al arrancar (código {process.returncode})")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1.0).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+def seed(env, args):
+    command = [
+        sys.executable, "-m", "scripts.seed_data", "--sqlite",
+        "--seed", str(args.seed),
+        "--departments", str(args.departments),
+        "--users", str(args.users),
+        "--tickets", str(args.tickets),
+        "--comments", str(args.comments),
+        "--mensajes", "0",
+    ]
+    subprocess.run(command, cwd=ROOT, env=env, check=True)
+
+
+# --- Usuarios virtuales ----------------------------------------------------------
+
+class VirtualUser:
+
+    def __init__(self, email: str, role: str):
+        self.email = email
+        self.role = role
+        self.headers = {}
+        # Tickets visibles (detalle, comentarios) y propios (adjuntos)
+        self.visible_ids = []
+        self.own_ids = []
+
+
+def load_virtual_users(db_path: Path, count: int):
+    connection = sqlite3.connect(db_path)
+    try:
+        users = []
+        for role, share in ROLE_SHARES.items():
+            limit = max(1, round(count * share))
+            rows = connection.execute(
+                "SELECT email FROM users WHERE role = ? ORDER BY id LIMIT ?", (role, limit)
+            ).fetchall()
+            users.extend(VirtualUser(email, role) for (email,) in rows)
+        departments = [row[0] for row in connection.execute("SELECT id FROM departments ORDER BY id")]
+    finally:
+        connection.close()
+    return users, departments
+
+
+# --- Escenarios --------------------------------------------------------------------
+# Cada escenario devuelve (etiqueta, respuesta); la etiqueta usa la plantilla de ruta
+# para agregar todas las peticiones de un mismo endpoint.
+
+async def login(client, user, rng, context):
+    response = await client.post("/token", data={"username": user.email, "password": SEED_PASSWORD})
+    return "POST /token", response
+
+async def list_tickets(client, user, rng, context):
+    response = await client.get("/tickets/", params={"limit": 50}, headers=user.headers)
+    return "GET /tickets/", response
+
+async def ticket_detail(client, user, rng, context):
+    ticket_id = rng.choice(user.visible_ids or user.own_ids or ["inexistente"])
+    response = await client.get(f"/tickets/{ticket_id}", headers=user.headers)
+    return "GET /tickets/{ticket_id}", response
+
+async def create_ticket(client, user, rng, context):
+    response = await client.post("/tickets/", headers=user.headers, json={
+        "title": "Benchmark: nuevo ticket",
+        "description": "Ticket creado por el benchmark de la API",
+        "departamento_id": rng.choice(context["departments"]),
+        "priority": rng.choice(("baja", "media", "alta", "crítica")),
+    })
+    if response.status_code == 200:
+        user.own_ids.append(response.json()["id"])
+    return "POST /tickets/", response
+
+async def add_comment(client, user, rng, context):
+    ticket_id = rng.choice(user.visible_ids or user.own_ids or ["inexistente"])
+    response = await client.post(f"/tickets/{ticket_id}/comments/", headers=user.headers, json={
+        "content": "Comentario del benchmark",
+        "ticket_id": ticket_id,
+    })
+    return "POST /tickets/{ticket_id}/comments/", response
+
+async def upload_attachment(client, user, rng, context):
+    ticket_id = rng.choice(user.own_ids or user.visible_ids or ["inexistente"])
+    # Contenido distinto en cada subida para no medir solo la deduplicación
+    content = rng.randbytes(ATTACHMENT_BYTES)
+    response = await client.post(
+        "/attachments/",
+        headers=user.headers,
+        data={"ticket_id": ticket_id},
+        files={"file": ("benchmark.bin", content, "application/octet-stream")},
+    )
+    return "POST /attachments/", response
+
+SCENARIOS = {
+    "login": login,
+    "list": list_tickets,
+    "detail": ticket_detail,
+    "create": create_ticket,
+    "comment": add_comment,
+    "attachment": upload_attachment,
+}
+
+
+def parse_mix(mix: str):
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Escenario desconocido: {name}")
+        weights[name] = float(weight)
+    return weights
+
+
+async def prepare_users(client, users, context):
+    # Preparación no medida: token, tickets visibles y un ticket propio por usuario
+    rng = random.Random(0)
+    for user in users:
+        response = await client.post("/token", data={"username": user.email, "password": SEED_PASSWORD})
+        response.raise_for_status()
+        user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await client.get("/tickets/", params={"limit": 100}, headers=user.headers)
+        if response.status_code == 200:
+            user.visible_ids = [ticket["id"] for ticket in response.json()]
+        await create_ticket(client, user, rng, context)
+
+
+# --- Ejecución y métricas ---------------------------------------------------------
+
+def percentile(sorted_values, fraction: float):
+    # Percentil por rango más cercano
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def summarize(samples, statuses, measured_seconds: float):
+    endpoints = {}
+    all_latencies = []
+    for label, latencies in samples.items():
+        latencies.sort()
+        all_latencies.extend(latencies)
+        errors = sum(count for code, count in statuses[label].items() if code == "error" or int(code) >= 400)
+        endpoints[label] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": round(len(latencies) / measured_seconds, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+            "status": dict(statuses[label]),
+        }
+    all_latencies.sort()
+    total = {
+        "requests": len(all_latencies),
+        "rps": round(len(all_latencies) / measured_seconds, 2),
+        "p50_ms": round((percentile(all_latencies, 0.50) or 0) * 1000, 2),
+        "p95_ms": round((percentile(all_latencies, 0.95) or 0) * 1000, 2),
+        "p99_ms": round((percentile(all_latencies, 0.99) or 0) * 1000, 2),
+    }
+    return endpoints, total
+
+
+async def drive(base_url: str, users, context, args):
+    weights = parse_mix(args.mix)
+    names, scenario_weights = list(weights), list(weights.values())
+    samples = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        await prepare_users(client, users, context)
+
+        start = time.perf_counter()
+        measure_from = start + args.warmup
+        stop_at = measure_from + args.duration
+
+        async def worker(index: int):
+            rng = random.Random(args.seed * 1000 + index)
+            while time.perf_counter() < stop_at:
+                user = users[rng.randrange(len(users))]
+                name = rng.choices(names, scenario_weights)[0]
+                started = time.perf_counter()
+                try:
+                    label, response = await SCENARIOS[name](client, user, rng, context)
+                    code = str(response.status_code)
+                except httpx.HTTPError:
+                    # Sin respuesta (timeout, conexión): se agrupa por nombre de escenario
+                    label, code = name, "error"
+                finished = time.perf_counter()
+                # Solo cuentan las peticiones que empiezan tras el calentamiento
+                if started >= measure_from and finished <= stop_at:
+                    samples[label].append(finished - started)
+                    statuses[label][code] += 1
+
+        await asyncio.gather(*(worker(index) for index in range(args.concurrency)))
+    return summarize(samples, statuses, args.duration)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def upload_root(db_path: Path) -> Path:
+    # Adjuntos del escenario "attachment" junto a la base de prueba, fuera del repositorio
+    return db_path.with_name(f"{db_path.stem}_uploads")
+
+
+def run(args):
+    db_path = Path(args.db).resolve()
+    uploads = upload_root(db_path)
+    # Los usuarios virtuales comparten IP: se mide la API, no el limitador de peticiones
+    env = dict(
+        os.environ,
+        DB_BACKEND="sqlite",
+        SQLITE_DATABASE_PATH=str(db_path),
+        UPLOAD_ROOT=str(uploads),
+        RATE_LIMIT_ENABLED="false",
+    )
+    if args.reseed:
+        # La base y los blobs de sus adjuntos se regeneran juntos
+        for path in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")):
+            path.unlink(missing_ok=True)
+        shutil.rmtree(uploads, ignore_errors=True)
+    if not db_path.exists():
+        seed(env, args)
+
+    users, departments = load_virtual_users(db_path, args.virtual_users)
+    if not users or not departments:
+        raise SystemExit("La base de prueba no tiene usuarios o departamentos")
+
+    server = start_server(env, args.port)
+    try:
+        endpoints, total = asyncio.run(drive(
+            f"http://127.0.0.1:{args.port}", users, {"departments": departments}, args
+        ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "volumes": {
+                "departments": args.departments,
+                "users": args.users,
+                "tickets": args.tickets,
+                "comments": args.comments,
+            },
+            "concurrency": args.concurrency,
+            "virtual_users": len(users),
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "mix": parse_mix(args.mix),
+        },
+        "endpoints": endpoints,
+        "total": total,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True, ensure_ascii=False) + "\n")
+    print_report(report)
+    print(f"Resultados guardados en {args.output}")
+
+
+def print_report(report):
+    print(f"{'endpoint':40} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for label, stats in sorted(report["endpoints"].items()):
+        print(
+            f"{label:40} {stats['rps']:9.1f} {stats['p50_ms']:9.1f} "
+            f"{stats['p95_ms']:9.1f} {stats['p99_ms']:9.1f} {stats['errors']:8d}"
+        )
+    total = report["total"]
+    print(f"{'total':40} {total['rps']:9.1f} {total['p50_ms']:9.1f} {total['p95_ms']:9.1f} {total['p99_ms']:9.1f}")
+
+
+def compare(args):
+    before = json.loads(Path(args.before).read_text())
+    after = json.loads(Path(args.after).read_text())
+
+    def change(old, new):
+        if not old:
+            return "    n/a"
+        return f"{(new - old) / old * 100:+7.1f}%"
+
+    print(f"{'endpoint':40} {'métrica':8} {'antes':>10} {'después':>10} {'cambio':>9}")
+    for label in sorted(set(before["endpoints"]) | set(after["endpoints"])):
+        old = before["endpoints"].get(label)
+        new = after["endpoints"].get(label)
+        if old is None or new is None:
+            print(f"{label:40} solo en {'después' if old is None else 'antes'}")
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            print(f"{label:40} {metric:8} {old[metric]:10.2f} {new[metric]:10.2f} {change(old[metric], new[metric])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTTP de la API sobre SQLite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Cargar datos, arrancar la API y medir")
+    run_parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="Archivo SQLite de prueba")
+    run_parser.add_argument("--reseed", action="store_true", help="Borrar la base y volver a cargar los datos")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--departments", type=int, default=20)
+    run_parser.add_argument("--users", type=int, default=2000)
+    run_parser.add_argument("--tickets", type=int, default=50_000)
+    run_parser.add_argument("--comments", type=int, default=200_000)
+    run_parser.add_argument("--virtual-users", type=int, default=50, help="Usuarios distintos que inician sesión")
+    run_parser.add_argument("--concurrency", type=int, default=16, help="Peticiones simultáneas")
+    run_parser.add_argument("--duration", type=float, default=30.0, help="Segundos medidos")
+    run_parser.add_argument("--warmup", type=float, default=5.0, help="Segundos iniciales descartados")
+    run_parser.add_argument("--timeout", type=float, default=30.0, help="Timeout por petición")
+    run_parser.add_argument("--mix", default=DEFAULT_MIX, help="Pesos por escenario: nombre=peso,...")
+    run_parser.add_argument("--port", type=int, default=8765)
+    run_parser.add_argument("--output", default="bench_results.json")
+    run_parser.set_defaults(handler=run)
+
+    serve_parser = commands.add_parser("serve", help="(interno) servir la API sobre la base SQLite")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.set_defaults(handler=serve)
+
+    compare_parser = commands.add_parser("compare", help="Comparar dos resultados")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
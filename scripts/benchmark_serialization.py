@@ -0,0 +1,102 @@
+# Coste por elemento de serializar una página de tickets (con sus comentarios):
+#   - fastapi: lo que hace FastAPI con response_model (validar, volcar a tipos JSON y json.dumps)
+#   - validado: TypeAdapter cacheado + JSON escrito por pydantic-core (por defecto)
+#   - confiado: serializador compilado + orjson, sin revalidar (FAST_JSON_TRUSTED=true)
+# Las filas son objetos ORM reales cargados con crud.tickets.get_tickets_async (mismo
+# perfil de carga que GET /tickets/) desde una base SQLite ya cargada con scripts.seed_data.
+# Uso: DB_BACKEND=sqlite SQLITE_DATABASE_PATH=benchmark.db \
+#        python -m scripts.benchmark_serialization --items 100 --repeat 300
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+
+from crud import tickets as crud_tickets
+from crud.policy import ADMINISTRADOR, Principal
+from database import DB_BACKEND, AsyncSessionLocal
+from schemas.schemas import Ticket
+from utils import serialization
+
+
+async def load_tickets(count: int):
+    # Una página de la API vista por un administrador, con sus comentarios
+    async with AsyncSessionLocal() as db:
+        return list(await crud_tickets.get_tickets_async(
+            db, limit=count, principal=Principal("benchmark", ADMINISTRADOR)
+        ))
+
+
+# FastAPI también crea el campo del response_model una sola vez por ruta
+FASTAPI_ADAPTER = TypeAdapter(List[Ticket])
+
+def fastapi_default(items):
+    # Equivalente a serialize_response + JSONResponse.render de FastAPI
+    value = FASTAPI_ADAPTER.validate_python(items, from_attributes=True)
+    content = FASTAPI_ADAPTER.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+def validated(items):
+    serialization.FAST_JSON_TRUSTED = False
+    return serialization.dump_list(Ticket, items)
+
+def trusted(items):
+    serialization.FAST_JSON_TRUSTED = True
+    return serialization.dump_list(Ticket, items)
+
+STRATEGIES = {"fastapi": fastapi_default, "validado": validated, "confiado": trusted}
+
+
+def measure(function, items, repeat: int):
+    function(items)  # calentamiento (compilación de esquemas y serializadores)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(items)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medir el coste de serializar listas de tickets")
+    parser.add_argument("--items", type=int, default=100, help="Tickets por página")
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--output", help="Guardar los resultados en JSON")
+    args = parser.parse_args()
+
+    if DB_BACKEND != "sqlite":
+        raise SystemExit("Ejecutar con DB_BACKEND=sqlite y SQLITE_DATABASE_PATH apuntando a una base cargada")
+    items = asyncio.run(load_tickets(args.items))
+    if not items:
+        raise SystemExit("La base no tiene tickets: cargarla antes con scripts.seed_data")
+    comments = sum(len(item.comments) for item in items)
+    print(f"{len(items)} tickets, {comments} comentarios")
+    # Las tres estrategias deben producir el mismo documento
+    reference = json.loads(fastapi_default(items))
+    for name, function in STRATEGIES.items():
+        if json.loads(function(items)) != reference:
+            raise SystemExit(f"La estrategia '{name}' no produce el mismo JSON que FastAPI")
+
+    results = {}
+    baseline = None
+    print(f"{'estrategia':12} {'página ms':>10} {'µs/elemento':>12} {'mejora':>8}")
+    for name, function in STRATEGIES.items():
+        page = measure(function, items, args.repeat)
+        baseline = baseline or page
+        results[name] = {
+            "page_ms": round(page * 1000, 3),
+            "per_item_us": round(page / len(items) * 1_000_000, 2),
+            "speedup": round(baseline / page, 2),
+        }
+        print(f"{name:12} {page * 1000:10.3f} {page / len(items) * 1_000_000:12.2f} {baseline / page:7.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"items": len(items), "comments": comments, "results": results}, output, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
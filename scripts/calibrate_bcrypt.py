@@ -0,0 +1,49 @@
+# Calibra el coste de bcrypt para una latencia objetivo en el hardware actual.
+# Uso: python -m scripts.calibrate_bcrypt --target-ms 250
+import argparse
+import statistics
+import time
+
+from passlib.hash import bcrypt
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 16
+
+
+def measure_rounds(rounds: int, samples: int) -> float:
+    hasher = bcrypt.using(rounds=rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        hasher.hash("calibracion-contraseña")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, samples: int):
+    results = {}
+    chosen = MIN_ROUNDS
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        elapsed = measure_rounds(rounds, samples)
+        results[rounds] = elapsed
+        print(f"rounds={rounds:2d}  mediana={elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+    return chosen, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrar el coste de bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Latencia máxima por hash en milisegundos")
+    parser.add_argument("--samples", type=int, default=3, help="Mediciones por coste")
+    args = parser.parse_args()
+
+    chosen, results = calibrate(args.target_ms, args.samples)
+    print()
+    print(f"Coste recomendado: {chosen} ({results[chosen]:.1f} ms por hash)")
+    print(f"Configure BCRYPT_ROUNDS={chosen} en el entorno del servidor")
+
+
+if __name__ == "__main__":
+    main()
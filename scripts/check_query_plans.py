@@ -0,0 +1,195 @@
+# Comprueba con EXPLAIN QUERY PLAN que las consultas de listado usan índices en SQLite.
+# Ejecuta las funciones reales de crud contra una base SQLite, captura cada SELECT que
+# emiten (incluidas las de selectinload) y falla si alguna recorre una tabla entera
+# (SCAN sin índice), si no usa el índice declarado para ese listado o, en los listados
+# paginados, si ordena con un B-tree temporal en lugar de leer en el orden del índice.
+# tests/test_query_plans.py ejecuta las mismas comprobaciones con pytest.
+# Sin --db crea una base temporal con el esquema y una fila por tabla (sin ANALYZE, el
+# planificador supone tablas grandes); con --db usa una base ya cargada (scripts.seed_data)
+# tras scripts.migrate_indexes --sqlite.
+# Uso: DB_BACKEND=sqlite python -m scripts.check_query_plans [--db benchmark.db] [--verbose]
+import argparse
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from crud import attachment, mensaje, tickets
+from crud.pagination import encode_cursor
+from crud.policy import ADMINISTRADOR, SOPORTE, USUARIO, Principal
+from models.database_models import Attachment, Comment, Mensaje, Ticket
+from scripts.create_tables import create_tables
+
+TICKET_ID = "00000000-0000-0000-0000-000000000001"
+USER_ID = "00000000-0000-0000-0000-000000000002"
+DEPARTMENT_ID = "00000000-0000-0000-0000-000000000003"
+CREATED_AT = datetime(2025, 1, 1)
+
+ADMIN = Principal(USER_ID, ADMINISTRADOR)
+USER = Principal(USER_ID, USUARIO)
+SUPPORT = Principal(USER_ID, SOPORTE, DEPARTMENT_ID)
+CURSOR = encode_cursor([CREATED_AT, TICKET_ID])
+
+
+async def _drain(rows):
+    async for _ in rows:
+        pass
+
+# (nombre, consulta, exige orden por índice, índice que debe aparecer en el plan)
+# para cada listado de la API
+SCENARIOS = (
+    ("tickets", lambda db: tickets.get_tickets_async(db, principal=ADMIN), True, "ix_ticket_createdAt_id"),
+    ("tickets?status", lambda db: tickets.get_tickets_async(db, status="abierto", principal=ADMIN), True,
+     "ix_ticket_status_createdAt_id"),
+    ("tickets?departamento", lambda db: tickets.get_tickets_async(db, departamento=DEPARTMENT_ID, principal=ADMIN), True,
+     "ix_ticket_departamento_id_createdAt_id"),
+    ("tickets?cursor", lambda db: tickets.get_tickets_async(db, status="abierto", principal=ADMIN, cursor=CURSOR), True,
+     "ix_ticket_status_createdAt_id"),
+    ("tickets usuario", lambda db: tickets.get_tickets_async(db, principal=USER), True, "ix_ticket_user_id_createdAt_id"),
+    # departamento OR asignado: cada rama usa su índice, el orden final requiere un sort
+    ("tickets soporte", lambda db: tickets.get_tickets_async(db, principal=SUPPORT), False,
+     "ix_ticket_assigned_to_createdAt_id"),
+    ("tickets versión", lambda db: tickets.get_tickets_version_async(db, principal=USER), True,
+     "ix_ticket_user_id_createdAt_id"),
+    ("ticket versión", lambda db: tickets.get_ticket_version_async(db, TICKET_ID, principal=USER), False,
+     "ix_comments_ticket_id_created_at"),
+    ("exportación", lambda db: _drain(tickets.stream_tickets_async(
+        db, principal=USER, since=datetime(2024, 1, 1), until=datetime(2026, 1, 1)
+    )), True, "ix_ticket_user_id_createdAt_id"),
+    ("adjuntos del ticket", lambda db: attachment.get_attachments_by_ticket_async(db, TICKET_ID, principal=USER), False,
+     "ix_attachements_ticket_id"),
+    ("mensajes", lambda db: mensaje.get_mensajes_async(db, principal=ADMIN), True, "ix_mensage_createdAt_id"),
+    ("mensajes usuario", lambda db: mensaje.get_mensajes_async(db, principal=USER), True,
+     "ix_mensage_users_id_createdAt_id"),
+    ("mensajes por usuario", lambda db: mensaje.get_mensajes_by_user_async(db, USER_ID), True,
+     "ix_mensage_users_id_createdAt_id"),
+)
+
+# "SCAN ticket" o "SCAN TABLE ticket" (versiones antiguas), sin "USING ... INDEX"
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(?!CONSTANT ROW)(\w+)(?: AS \w+)?$")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+def create_fixture_db(db_path: str):
+    # Esquema completo y una fila por tabla (sin ANALYZE)
+    engine = create_engine(f"sqlite:///{db_path}")
+    create_tables(engine)
+    insert_fixture(engine)
+    engine.dispose()
+
+
+def insert_fixture(engine):
+    # Una fila por tabla para que se ejecuten también las consultas de selectinload
+    with engine.begin() as connection:
+        connection.execute(insert(Ticket.__table__).values(
+            id=TICKET_ID, title="Ticket", status="abierto", departamento_id=DEPARTMENT_ID,
+            user_id=USER_ID, assigned_to=USER_ID, createdAt=CREATED_AT, updatedAt=CREATED_AT
+        ))
+        connection.execute(insert(Comment.__table__).values(
+            id=TICKET_ID, content="Comentario", ticket_id=TICKET_ID, user_id=USER_ID, created_at=CREATED_AT
+        ))
+        connection.execute(insert(Attachment.__table__).values(
+            id=TICKET_ID, file_name="a.txt", file_path="a.txt", ticket_id=TICKET_ID
+        ))
+        connection.execute(insert(Mensaje.__table__).values(
+            id=TICKET_ID, mensaje="Mensaje", users_id=USER_ID, createdAt=CREATED_AT
+        ))
+
+
+async def capture_statements(db_path: str):
+    # SELECT emitidos por cada escenario, con sus parámetros ya adaptados al driver
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    captured = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured[-1][1].append((statement, parameters))
+
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    try:
+        for name, scenario, ordered, index in SCENARIOS:
+            captured.append((name, [], ordered, index))
+            async with session_factory() as db:
+                await scenario(db)
+    finally:
+        await engine.dispose()
+    return captured
+
+
+def explain(connection, statement: str, parameters):
+    return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def plan_problems(plan, ordered: bool):
+    problems = [f"recorrido completo de {match.group(1)}" for match in map(FULL_SCAN.match, plan) if match]
+    if ordered and TEMP_SORT in plan:
+        problems.append("ORDER BY sin índice")
+    return problems
+
+
+def scenario_problems(connection, statements, ordered: bool, index: str):
+    # [(sentencia, plan, problemas)] de un escenario y los problemas del escenario entero
+    results = []
+    for statement, parameters in statements:
+        plan = explain(connection, statement, parameters)
+        results.append((statement, plan, plan_problems(plan, ordered)))
+    overall = []
+    if not statements:
+        overall.append("no se ejecutó ninguna consulta")
+    uses_index = re.compile(rf"\bINDEX {re.escape(index)}\b")
+    if statements and not any(uses_index.search(detail) for _, plan, _ in results for detail in plan):
+        overall.append(f"no usa {index}")
+    return results, overall
+
+
+def check_plans(db_path: str, captured, verbose: bool) -> int:
+    engine = create_engine(f"sqlite:///{db_path}")
+    failures = 0
+    with engine.connect() as connection:
+        for name, statements, ordered, index in captured:
+            results, overall = scenario_problems(connection, statements, ordered, index)
+            scenario_failures = bool(overall)
+            for problem in overall:
+                print(f"FALLO {name}: {problem}")
+            for statement, plan, problems in results:
+                scenario_failures += bool(problems)
+                if problems or verbose:
+                    print(f"{'FALLO' if problems else 'ok':5} {name}: {'; '.join(problems) or 'usa índices'}")
+                    print(f"      {' '.join(statement.split())[:200]}")
+                    for detail in plan:
+                        print(f"        {detail}")
+            if not scenario_failures and not verbose:
+                print(f"ok    {name} ({len(statements)} consultas)")
+            failures += scenario_failures
+    engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comprobar que los listados usan índices en SQLite")
+    parser.add_argument("--db", help="Base SQLite ya cargada; por defecto una temporal con el esquema")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar el plan de todas las consultas")
+    args = parser.parse_args()
+
+    if args.db:
+        db_path = os.path.abspath(args.db)
+    else:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="query_plans_"), "plans.db")
+        create_fixture_db(db_path)
+
+    captured = asyncio.run(capture_statements(db_path))
+    failures = check_plans(db_path, captured, args.verbose)
+    if failures:
+        print(f"{failures} consultas sin índice adecuado")
+        sys.exit(1)
+    print("Todas las consultas de listado usan índices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+# Crea el esquema completo: tablas, índices, ticket_stats y el índice de búsqueda.
+# Uso: python -m scripts.create_tables [--sqlite]
+import argparse
+
+from database import Base
+import models.database_models  # noqa: F401  (registra los modelos en Base.metadata)
+import crud.search  # noqa: F401  (instala el índice de búsqueda en after_create)
+
+
+def create_tables(engine):
+    # create_all solo crea lo que falta: se puede ejecutar sobre una base existente
+    Base.metadata.create_all(bind=engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crear las tablas del sistema de tickets")
+    parser.add_argument("--sqlite", action="store_true", help="Usar la base SQLite de desarrollo (models/base.py)")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from models.base import engine
+    else:
+        from database import engine
+
+    create_tables(engine)
+    print(f"Esquema creado ({engine.dialect.name})")
+
+
+if __name__ == "__main__":
+    main()
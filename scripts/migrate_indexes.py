@@ -0,0 +1,88 @@
+# Crea en una base existente los índices declarados en los modelos que aún no existen,
+# sin parar la API:
+#   - SQL Server: CREATE INDEX ... WITH (ONLINE = ON); las ediciones sin índices en línea
+#     (error 1712) reciben el índice sin ONLINE, que bloquea la tabla mientras se crea,
+#   - SQLite: CREATE INDEX bloquea solo a los escritores (en WAL los lectores siguen) y
+#     después ANALYZE actualiza las estadísticas del planificador.
+# Cada índice va en su propia transacción: si se interrumpe, basta con volver a ejecutarlo.
+# Uso: python -m scripts.migrate_indexes [--sqlite] [--dry-run]
+import argparse
+import time
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateIndex
+
+from database import Base
+import models.database_models  # noqa: F401  (registra los modelos en Base.metadata)
+
+
+def missing_indexes(engine):
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    pending = []
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        if table.name not in existing_tables:
+            # Tabla nueva: la crea scripts.create_tables junto con sus índices
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        pending.extend(index for index in sorted(table.indexes, key=lambda i: i.name) if index.name not in existing)
+    return pending
+
+
+def create_index_ddl(index, dialect, online: bool) -> str:
+    ddl = str(CreateIndex(index).compile(dialect=dialect))
+    if online and dialect.name == "mssql":
+        ddl += " WITH (ONLINE = ON)"
+    return ddl
+
+
+def _online_not_supported(exc: DBAPIError) -> bool:
+    return "1712" in str(exc.orig)
+
+
+def create_index(engine, index):
+    online = engine.dialect.name == "mssql"
+    try:
+        with engine.begin() as connection:
+            connection.exec_driver_sql(create_index_ddl(index, engine.dialect, online))
+    except DBAPIError as exc:
+        if not online or not _online_not_supported(exc):
+            raise
+        print(f"  {index.name}: la edición no admite ONLINE = ON, se crea bloqueando la tabla")
+        with engine.begin() as connection:
+            connection.exec_driver_sql(create_index_ddl(index, engine.dialect, online=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crear los índices que faltan en una base existente")
+    parser.add_argument("--sqlite", action="store_true", help="Usar la base SQLite de desarrollo (models/base.py)")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar las sentencias sin ejecutarlas")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from models.base import engine
+    else:
+        from database import engine
+
+    pending = missing_indexes(engine)
+    if not pending:
+        print(f"No faltan índices ({engine.dialect.name})")
+        return
+
+    for index in pending:
+        if args.dry_run:
+            print(create_index_ddl(index, engine.dialect, online=engine.dialect.name == "mssql") + ";")
+            continue
+        start = time.perf_counter()
+        create_index(engine, index)
+        print(f"  {index.table.name}.{index.name} creado en {time.perf_counter() - start:.1f} s")
+
+    if not args.dry_run and engine.dialect.name == "sqlite":
+        with engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+    print(f"{len(pending)} índices {'pendientes' if args.dry_run else 'creados'} ({engine.dialect.name})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# Reconstruye el índice de búsqueda de texto completo a partir de las tablas.
+# Uso: python -m scripts.rebuild_search_index [--sqlite]
+import argparse
+
+from crud.search import rebuild_search_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir el índice de búsqueda de tickets")
+    parser.add_argument("--sqlite", action="store_true", help="Usar la base SQLite de desarrollo (models/base.py)")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from models.base import engine
+    else:
+        from database import engine
+
+    with engine.begin() as connection:
+        rebuild_search_index(connection)
+    print(f"Índice de búsqueda reconstruido ({engine.dialect.name})")
+
+
+if __name__ == "__main__":
+    main()
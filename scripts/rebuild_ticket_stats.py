@@ -0,0 +1,25 @@
+# Recalcula desde cero los contadores de ticket_stats a partir de la tabla ticket.
+# Uso: python -m scripts.rebuild_ticket_stats [--sqlite]
+import argparse
+
+from crud.stats import rebuild_ticket_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruir las estadísticas de tickets")
+    parser.add_argument("--sqlite", action="store_true", help="Usar la base SQLite de desarrollo (models/base.py)")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        from models.base import engine
+    else:
+        from database import engine
+
+    # Una sola transacción: los lectores ven los contadores antiguos o los nuevos
+    with engine.begin() as connection:
+        rebuild_ticket_stats(connection)
+    print(f"Estadísticas de tickets reconstruidas ({engine.dialect.name})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# Generador de datos a escala de producción para pruebas de carga.
+# Crea el esquema y carga departamentos, categorías, usuarios, tickets, comentarios y
+# mensajes con INSERT por lotes (executemany de Core, sin objetos ORM). Con la misma
+# semilla y los mismos volúmenes produce exactamente los mismos datos.
+# Uso: python -m scripts.seed_data --sqlite --tickets 200000 --comments 1000000 --seed 7
+import argparse
+import random
+import time
+import uuid
+from array import array
+from itertools import accumulate
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from models.database_models import (
+    Categoria, CategoriaDepartamento, Comment, Department, Mensaje, Ticket, User
+)
+from crud.stats import rebuild_ticket_stats
+from scripts.create_tables import create_tables
+from utils.security import pwd_context
+
+SEED_PASSWORD = "seed-password"
+# Dominio reservado para ejemplos (RFC 2606): EmailStr rechaza ".local" y las respuestas
+# de /users/ no validarían
+SEED_EMAIL_DOMAIN = "seed.example.com"
+
+# Sesgo de estados: la mayoría de los tickets antiguos están cerrados; los más
+# recientes (RECENT_FRACTION) siguen abiertos o en curso
+STATUS_WEIGHTS = {"cerrado": 55, "resuelto": 22, "abierto": 10, "en progreso": 8, "en espera": 5}
+RECENT_STATUS_WEIGHTS = {"abierto": 45, "en progreso": 30, "en espera": 15, "resuelto": 8, "cerrado": 2}
+RECENT_FRACTION = 0.05
+PRIORITY_WEIGHTS = {"baja": 35, "media": 45, "alta": 16, "crítica": 4}
+# Reparto de roles entre los usuarios
+ROLE_WEIGHTS = {"usuario": 93, "soporte": 6, "administrador": 1}
+# Fracción de tickets sin asignar entre los abiertos
+UNASSIGNED_OPEN_FRACTION = 0.4
+# Exponente de Zipf para la popularidad de departamentos (tickets) y usuarios (mensajes)
+ZIPF_EXPONENT = 1.1
+
+TITLES = (
+    "No funciona la impresora", "Solicitud de acceso", "Error al iniciar sesión",
+    "Equipo lento", "Cambio de contraseña", "Instalación de software",
+    "Problema con el correo", "Falla de red", "Solicitud de equipo", "Reporte de incidencia",
+)
+WORDS = (
+    "el", "sistema", "usuario", "error", "pantalla", "servidor", "correo", "red",
+    "impresora", "acceso", "archivo", "reinicio", "configuración", "urgente", "oficina",
+    "contraseña", "aplicación", "factura", "reporte", "cliente", "equipo", "conexión",
+)
+FIRST_NAMES = ("Ana", "Luis", "María", "José", "Carmen", "Pedro", "Lucía", "Juan", "Sofía", "Miguel")
+LAST_NAMES = ("García", "Pérez", "Rodríguez", "Martínez", "Gómez", "Díaz", "Fernández", "Santos")
+
+
+class SeedIds:
+    # Identificadores deterministas: un prefijo aleatorio por (semilla, tabla) y el
+    # índice de la fila en los 48 bits bajos. No hace falta guardar millones de ids
+    # para referenciarlos desde otras tablas.
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self._prefixes = {}
+
+    def __call__(self, table: str, index: int) -> str:
+        prefix = self._prefixes.get(table)
+        if prefix is None:
+            prefix = random.Random(f"{self.seed}:{table}").getrandbits(80)
+            self._prefixes[table] = prefix
+        return str(uuid.UUID(int=(prefix << 48) | index))
+
+
+def zipf_cum_weights(count: int):
+    # Pesos acumulados: random.choices no tiene que recalcularlos en cada llamada
+    return list(accumulate(1 / (rank ** ZIPF_EXPONENT) for rank in range(1, count + 1)))
+
+def cum_weights(weights: dict):
+    return list(weights), list(accumulate(weights.values()))
+
+def sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words))).capitalize() + "."
+
+
+class Seeder:
+
+    def __init__(self, connection, args):
+        self.connection = connection
+        self.args = args
+        self.ids = SeedIds(args.seed)
+        self.until = datetime.fromisoformat(args.until)
+        self.since = self.until - timedelta(days=args.days)
+        self.span_seconds = (self.until - self.since).total_seconds()
+
+    # --- Utilidades --------------------------------------------------------
+
+    def insert(self, table, rows):
+        # Inserta un generador de filas en lotes, confirmando cada lote
+        total = 0
+        batch = []
+        start = time.perf_counter()
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.args.batch_size:
+                total += self._flush(table, batch)
+                batch = []
+                elapsed = time.perf_counter() - start
+                print(f"  {table.name}: {total:,} filas ({total / elapsed:,.0f}/s)", end="\r", flush=True)
+        if batch:
+            total += self._flush(table, batch)
+        elapsed = time.perf_counter() - start
+        print(f"  {table.name}: {total:,} filas en {elapsed:.1f} s" + " " * 20)
+        return total
+
+    def _flush(self, table, batch):
+        self.connection.execute(table.insert(), batch)
+        self.connection.commit()
+        return len(batch)
+
+    def ticket_created_at(self, index: int) -> datetime:
+        # Los tickets se reparten en orden cronológico a lo largo del periodo
+        return self.since + timedelta(seconds=self.span_seconds * index / max(self.args.tickets, 1))
+
+    # --- Tablas ------------------------------------------------------------
+
+    def seed_departments(self):
+        self.insert(Department.__table__, (
+            {"id": self.ids("departments", i), "nombre": f"Departamento {i + 1:03d}"}
+            for i in range(self.args.departments)
+        ))
+        self.department_weights = zipf_cum_weights(self.args.departments)
+
+    def seed_categorias(self):
+        rng = random.Random(f"{self.args.seed}:categorias")
+        self.insert(Categoria.__table__, (
+            {"id": self.ids("categoria", i), "nombre": f"Categoría {i + 1:03d}"}
+            for i in range(self.args.categorias)
+        ))
+        # Cada categoría se asigna a 1-3 departamentos; un departamento sin categorías
+        # recibe una para que todos los tickets puedan tener categoría
+        self.categorias_by_department = {d: [] for d in range(self.args.departments)}
+        rows = []
+        for c in range(self.args.categorias):
+            for d in rng.sample(range(self.args.departments), k=min(rng.randint(1, 3), self.args.departments)):
+                self.categorias_by_department[d].append(c)
+        for d, categorias in self.categorias_by_department.items():
+            if not categorias and self.args.categorias:
+                categorias.append(rng.randrange(self.args.categorias))
+            for c in categorias:
+                rows.append({"categoria_id": self.ids("categoria", c), "departamento_id": self.ids("departments", d)})
+        self.insert(CategoriaDepartamento.__table__, rows)
+
+    def seed_users(self):
+        rng = random.Random(f"{self.args.seed}:users")
+        # Un único hash para todos: bcrypt por fila haría la carga impracticable
+        hashed_password = pwd_context.hash(SEED_PASSWORD)
+        roles, role_weights = cum_weights(ROLE_WEIGHTS)
+        departments = range(self.args.departments)
+        self.support_by_department = {d: [] for d in departments}
+
+        def rows():
+            for i in range(self.args.users):
+                role = rng.choices(roles, cum_weights=role_weights)[0]
+                department = rng.choices(departments, cum_weights=self.department_weights)[0]
+                if role == "soporte":
+                    self.support_by_department[department].append(i)
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                yield {
+                    "id": self.ids("users", i),
+                    "nombre_Usuario": f"usuario{i}",
+                    "email": f"usuario{i}@{SEED_EMAIL_DOMAIN}",
+                    "extensión": str(1000 + rng.randrange(9000)),
+                    "nombre": f"{first} {last}",
+                    "departamento_id": self.ids("departments", department),
+                    "role": role,
+                    "hashed_password": hashed_password,
+                    "created_at": self.since + timedelta(seconds=rng.random() * self.span_seconds),
+                }
+
+        self.insert(User.__table__, rows())
+
+    def seed_tickets(self):
+        rng = random.Random(f"{self.args.seed}:tickets")
+        statuses, status_weights = cum_weights(STATUS_WEIGHTS)
+        recent_statuses, recent_weights = cum_weights(RECENT_STATUS_WEIGHTS)
+        priorities, priority_weights = cum_weights(PRIORITY_WEIGHTS)
+        # La tabla ticket no tiene prioridad en todos los despliegues
+        has_priority = "priority" in Ticket.__table__.c
+        departments = range(self.args.departments)
+        recent_from = int(self.args.tickets * (1 - RECENT_FRACTION))
+        # Solicitante y asignado por índice, para que los comentarios los reutilicen
+        self.requesters = array("l")
+        self.assignees = array("l")
+
+        def rows():
+            for i in range(self.args.tickets):
+                if i >= recent_from:
+                    status = rng.choices(recent_statuses, cum_weights=recent_weights)[0]
+                else:
+                    status = rng.choices(statuses, cum_weights=status_weights)[0]
+                department = rng.choices(departments, cum_weights=self.department_weights)[0]
+                categorias = self.categorias_by_department[department]
+                support = self.support_by_department[department]
+                requester = rng.randrange(self.args.users)
+                assignee = -1
+                if support and not (status == "abierto" and rng.random() < UNASSIGNED_OPEN_FRACTION):
+                    assignee = rng.choice(support)
+                self.requesters.append(requester)
+                self.assignees.append(assignee)
+                created_at = self.ticket_created_at(i)
+                closed = status in ("resuelto", "cerrado")
+                row = {
+                    "id": self.ids("ticket", i),
+                    "title": rng.choice(TITLES),
+                    "descripcion": sentence(rng, 8, 40),
+                    "departamento_id": self.ids("departments", department),
+                    "categoria_id": self.ids("categoria", rng.choice(categorias)) if categorias else None,
+                    "user_id": self.ids("users", requester),
+                    "status": status,
+                    "assigned_to": self.ids("users", assignee) if assignee >= 0 else None,
+                    "createdAt": created_at,
+                    "updatedAt": created_at + timedelta(hours=rng.expovariate(1 / (72 if closed else 12))),
+                }
+                if has_priority:
+                    row["priority"] = rng.choices(priorities, cum_weights=priority_weights)[0]
+                yield row
+
+        self.insert(Ticket.__table__, rows())
+
+    def seed_comments(self):
+        rng = random.Random(f"{self.args.seed}:comments")
+        total = self.args.comments
+        if not self.args.tickets or not total:
+            return
+        mean = total / self.args.tickets
+
+        def rows():
+            # Número de comentarios por ticket con distribución exponencial (muchos
+            # tickets con pocos, algunos con muchos); se recorren los tickets en orden
+            # hasta alcanzar el total pedido
+            produced = 0
+            ticket = 0
+            while produced < total:
+                count = min(int(rng.expovariate(1 / mean) + 0.5), total - produced)
+                created_at = self.ticket_created_at(ticket)
+                participants = [self.requesters[ticket]]
+                if self.assignees[ticket] >= 0:
+                    participants.append(self.assignees[ticket])
+                for _ in range(count):
+                    created_at += timedelta(minutes=rng.expovariate(1 / 240))
+                    yield {
+                        "id": self.ids("comments", produced),
+                        "content": sentence(rng, 3, 30),
+                        "ticket_id": self.ids("ticket", ticket),
+                        "user_id": self.ids("users", rng.choice(participants)),
+                        "created_at": created_at,
+                    }
+                    produced += 1
+                ticket = (ticket + 1) % self.args.tickets
+
+        self.insert(Comment.__table__, rows())
+
+    def seed_mensajes(self):
+        rng = random.Random(f"{self.args.seed}:mensajes")
+        user_weights = zipf_cum_weights(self.args.users)
+        users = range(self.args.users)
+
+        def rows():
+            for i in range(self.args.mensajes):
+                created_at = self.since + timedelta(seconds=self.span_seconds * i / self.args.mensajes)
+                yield {
+                    "id": self.ids("mensage", i),
+                    "mensaje": sentence(rng, 3, 25),
+                    "users_id": self.ids("users", rng.choices(users, cum_weights=user_weights)[0]),
+                    "createdAt": created_at,
+                    "updatedAt": created_at,
+                }
+
+        self.insert(Mensaje.__table__, rows())
+
+    def run(self):
+        print("Departamentos y categorías")
+        self.seed_departments()
+        self.seed_categorias()
+        print("Usuarios")
+        self.seed_users()
+        print("Tickets")
+        self.seed_tickets()
+        print("Comentarios")
+        self.seed_comments()
+        print("Mensajes")
+        self.seed_mensajes()
+        # Los INSERT de Core no disparan los eventos que mantienen ticket_stats
+        print("Estadísticas de tickets")
+        rebuild_ticket_stats(self.connection)
+        self.connection.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cargar datos de prueba a escala")
+    parser.add_argument("--sqlite", action="store_true", help="Usar la base SQLite de desarrollo (models/base.py)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla: misma semilla y volúmenes, mismos datos")
+    parser.add_argument("--departments", type=int, default=50)
+    parser.add_argument("--categorias", type=int, default=120)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--tickets", type=int, default=2_000_000)
+    parser.add_argument("--comments", type=int, default=10_000_000)
+    parser.add_argument("--mensajes", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=730, help="Periodo cubierto por los datos")
+    parser.add_argument("--until", default="2025-01-01", help="Fecha final del periodo (fija para que sea reproducible)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Filas por INSERT")
+    args = parser.parse_args()
+
+    if args.departments < 1 or args.users < 1:
+        parser.error("Se necesita al menos un departamento y un usuario")
+
+    if args.sqlite:
+        from models.base import engine
+    else:
+        from database import engine
+
+    create_tables(engine)
+    with engine.connect() as connection:
+        # Los ids deterministas chocarían con una carga anterior
+        if connection.execute(select(func.count()).select_from(User.__table__)).scalar():
+            parser.error("La base ya contiene usuarios; use una base vacía")
+        start = time.perf_counter()
+        Seeder(connection, args).run()
+    print(f"Carga completada en {time.perf_counter() - start:.1f} s ({engine.dialect.name})")
+
+
+if __name__ == "__main__":
+    main()
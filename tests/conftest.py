@@ -0,0 +1,50 @@
+# Las pruebas usan el perfil SQLite: database.py lee DB_BACKEND al importarse, así que
+# se fija antes de importar cualquier módulo de la aplicación
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="tests_")
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_DATABASE_PATH", os.path.join(_TMP_DIR, "app.db"))
+os.environ.setdefault("UPLOAD_ROOT", os.path.join(_TMP_DIR, "uploads"))
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    # API completa sobre la base SQLite de SQLITE_DATABASE_PATH con el esquema creado
+    from fastapi.testclient import TestClient
+
+    from database import engine
+    from main import app
+    from scripts.create_tables import create_tables
+
+    create_tables(engine)
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def login(client):
+    # Crea un usuario con el rol indicado y devuelve las cabeceras con su token
+    import uuid
+
+    def _login(role: str = "usuario", departamento_id: str = None):
+        email = f"{role}-{uuid.uuid4().hex[:8]}@example.com"
+        response = client.post("/users/", json={
+            "email": email,
+            "nombre_Usuario": email.split("@")[0],
+            "nombre": "Usuario de prueba",
+            "departamento_id": departamento_id,
+            "role": role,
+            "password": "contraseña-segura",
+        })
+        assert response.status_code == 200, response.text
+        response = client.post("/token", data={"username": email, "password": "contraseña-segura"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return _login
@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+
+import main
+from utils.files import UploadSizeLimitMiddleware
+
+
+@pytest.fixture
+def small_upload_limit(client, monkeypatch):
+    # Límite de 1 KiB solo para esta prueba
+    layer = main.app.middleware_stack
+    while not isinstance(layer, UploadSizeLimitMiddleware):
+        layer = layer.app
+    monkeypatch.setattr(layer, "max_body", 1024)
+
+
+def create_ticket(client, login):
+    admin = login("administrador")
+    response = client.post("/departments/", json={"nombre": f"Adjuntos {uuid.uuid4().hex[:8]}"}, headers=admin)
+    assert response.status_code == 200, response.text
+    headers = login("usuario")
+    response = client.post("/tickets/", headers=headers, json={
+        "title": "Ticket con adjunto", "description": "Ticket para subir archivos",
+        "departamento_id": response.json()["id"], "priority": "media",
+    })
+    assert response.status_code == 200, response.text
+    return headers, response.json()["id"]
+
+
+def test_upload_within_limit(client, login, small_upload_limit):
+    headers, ticket_id = create_ticket(client, login)
+    response = client.post(
+        "/attachments/", headers=headers,
+        data={"ticket_id": ticket_id}, files={"file": ("informe año.txt", b"contenido", "text/plain")},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["file_size"] == len(b"contenido")
+
+
+def test_oversized_upload_is_rejected_by_content_length(client, login, small_upload_limit):
+    headers, ticket_id = create_ticket(client, login)
+    response = client.post(
+        "/attachments/", headers=headers,
+        data={"ticket_id": ticket_id}, files={"file": ("grande.bin", b"x" * 4096, "application/octet-stream")},
+    )
+    assert response.status_code == 413, response.text
+
+
+def test_chunked_upload_is_cut_at_the_limit(client, login, small_upload_limit):
+    headers, ticket_id = create_ticket(client, login)
+
+    def body():
+        # Sin Content-Length: el cuerpo llega por bloques
+        for _ in range(16):
+            yield b"x" * 512
+
+    response = client.post(
+        "/attachments/", headers={**headers, "Content-Type": "multipart/form-data; boundary=limite"}, content=body(),
+    )
+    assert response.status_code == 413, response.text
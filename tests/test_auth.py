@@ -0,0 +1,18 @@
+import uuid
+
+from auth.principal_cache import principal_cache
+
+
+def test_cached_principal_survives_rollback(client, login):
+    headers = login("administrador")
+    # Caché fría: la primera petición carga el usuario en la sesión que luego hace rollback
+    principal_cache.clear()
+    name = f"Departamento {uuid.uuid4().hex[:8]}"
+    assert client.post("/departments/", json={"nombre": name}, headers=headers).status_code == 200
+    principal_cache.clear()
+    response = client.post("/departments/", json={"nombre": name}, headers=headers)
+    assert response.status_code == 400, response.text
+
+    response = client.post("/departments/", json={"nombre": f"{name} bis"}, headers=headers)
+    assert response.status_code == 200, response.text
+    assert client.get("/users/me/", headers=headers).status_code == 200
@@ -0,0 +1,18 @@
+import pytest
+
+from database import get_async_db
+from main import app
+
+
+def dependency_calls(dependant):
+    for dependency in dependant.dependencies:
+        yield dependency.call
+        yield from dependency_calls(dependency)
+
+
+@pytest.mark.parametrize("path", ["/events/stream", "/tickets/export"])
+def test_streaming_endpoints_release_the_request_session(path):
+    # Las dependencias con yield se cierran al terminar la respuesta: una sesión de
+    # get_async_db retendría su conexión mientras dure el stream
+    route = next(route for route in app.routes if getattr(route, "path", None) == path)
+    assert get_async_db not in set(dependency_calls(route.dependant))
@@ -0,0 +1,33 @@
+# Cada listado de la API debe usar su índice en SQLite (ver scripts/check_query_plans.py)
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+
+from scripts.check_query_plans import SCENARIOS, capture_statements, create_fixture_db, scenario_problems
+
+
+@pytest.fixture(scope="module")
+def captured(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("query_plans") / "plans.db")
+    create_fixture_db(db_path)
+    scenarios = {
+        name: (statements, ordered, index)
+        for name, statements, ordered, index in asyncio.run(capture_statements(db_path))
+    }
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as connection:
+        yield connection, scenarios
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", [scenario[0] for scenario in SCENARIOS])
+def test_listing_uses_index(captured, name):
+    connection, scenarios = captured
+    statements, ordered, index = scenarios[name]
+    results, overall = scenario_problems(connection, statements, ordered, index)
+    problems = overall + [
+        f"{'; '.join(problems)}: {' '.join(statement.split())[:200]} -> {plan}"
+        for statement, plan, problems in results if problems
+    ]
+    assert not problems, "\n".join(problems)
@@ -0,0 +1,39 @@
+import asyncio
+
+from crud.reference_cache import VersionedCache
+
+
+def test_entries_and_etags_expire_after_ttl():
+    clock = [1000.0]
+    cache = VersionedCache(ttl=60, clock=lambda: clock[0])
+    loads = []
+
+    async def load():
+        loads.append(len(loads))
+        return len(loads)
+
+    async def scenario():
+        first = await cache.get_or_load(("departments",), "list", load)
+        etag = cache.etag("departments")
+        assert await cache.get_or_load(("departments",), "list", load) == first
+        assert cache.etag("departments") == etag
+        # Un cambio hecho por otro proceso solo se ve al caducar la época
+        clock[0] += 60
+        assert await cache.get_or_load(("departments",), "list", load) != first
+        assert cache.etag("departments") != etag
+
+    asyncio.run(scenario())
+    assert len(loads) == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_entries_are_capped():
+    cache = VersionedCache(max_entries=3, ttl=0)
+
+    async def scenario():
+        for skip in range(10):
+            await cache.get_or_load(("departments",), ("list", skip), lambda: asyncio.sleep(0, skip))
+
+    asyncio.run(scenario())
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["evictions"] == 7
@@ -0,0 +1,70 @@
+import asyncio
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db import sqlite as sqlite_profile
+from crud import tickets
+from crud.policy import ADMINISTRADOR, Principal
+from models.database_models import Department, Ticket, TicketStat, User
+from models.schemas import TicketCreate, TicketUpdate
+from scripts.create_tables import create_tables
+
+ADMIN = Principal("admin", ADMINISTRADOR)
+
+
+def stats_match_counts(db_path) -> bool:
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as connection:
+        counts = dict(connection.execute(select(Ticket.status, func.count()).group_by(Ticket.status)).all())
+        stats = dict(connection.execute(
+            select(TicketStat.value, TicketStat.count).where(TicketStat.dimension == "status", TicketStat.count != 0)
+        ).all())
+    engine.dispose()
+    return counts == stats
+
+
+async def concurrent_updates(db_path, update):
+    writer, reader = sqlite_profile.create_sqlite_engines(f"sqlite+aiosqlite:///{db_path}")
+    session_factory = async_sessionmaker(
+        bind=writer, class_=AsyncSession, expire_on_commit=False,
+        sync_session_class=sqlite_profile.routing_session_class(writer, reader),
+    )
+    try:
+        async with session_factory() as db:
+            ticket = await tickets.create_ticket_async(db, TicketCreate(
+                title="Ticket concurrente", description="Dos cambios de estado a la vez",
+                departamento_id="d1", priority="media",
+            ), user_id="u1")
+        await asyncio.gather(*(update(session_factory, ticket.id) for _ in range(2)))
+    finally:
+        await writer.dispose()
+        await reader.dispose()
+
+
+async def close_ticket(session_factory, ticket_id):
+    async with session_factory() as db:
+        db_ticket = await tickets.get_ticket_async(db, ticket_id, profile="list", principal=ADMIN, for_update=True)
+        await tickets.update_ticket_async(db, db_ticket, TicketUpdate(status="cerrado"))
+
+
+async def bulk_close_ticket(session_factory, ticket_id):
+    async with session_factory() as db:
+        await tickets.bulk_update_tickets_async(db, TicketUpdate(status="cerrado"), ADMIN, ticket_ids=[ticket_id])
+
+
+def test_concurrent_status_changes_keep_stats_consistent(tmp_path, monkeypatch):
+    # Con una sola conexión de lectura las dos cargas ya quedarían serializadas
+    monkeypatch.setattr(sqlite_profile, "SQLITE_READ_POOL_SIZE", 4)
+    db_path = tmp_path / "stats.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    create_tables(engine)
+    with engine.begin() as connection:
+        connection.execute(Department.__table__.insert().values(id="d1", nombre="Soporte"))
+        connection.execute(User.__table__.insert().values(
+            id="u1", nombre_Usuario="u1", email="u1@example.com", nombre="U1", role="usuario", hashed_password="x"
+        ))
+    engine.dispose()
+    asyncio.run(concurrent_updates(db_path, close_ticket))
+    asyncio.run(concurrent_updates(db_path, bulk_close_ticket))
+    assert stats_match_counts(db_path)
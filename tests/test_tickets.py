@@ -0,0 +1,22 @@
+import re
+import uuid
+
+
+def test_ticket_detail_loads_only_what_it_returns(client, login):
+    admin = login("administrador")
+    department = client.post("/departments/", json={"nombre": f"Detalle {uuid.uuid4().hex[:8]}"}, headers=admin).json()
+    headers = login("usuario")
+    ticket = client.post("/tickets/", headers=headers, json={
+        "title": "Ticket de detalle", "description": "Ticket para medir consultas",
+        "departamento_id": department["id"], "priority": "media",
+    }).json()
+    client.post(f"/tickets/{ticket['id']}/comments/", headers=headers, json={
+        "content": "Primer comentario", "ticket_id": ticket["id"],
+    })
+
+    response = client.get(f"/tickets/{ticket['id']}", headers=headers)
+    assert response.status_code == 200, response.text
+    assert [comment["content"] for comment in response.json()["comments"]] == ["Primer comentario"]
+    # Sonda de versión + ticket + comentarios (usuario ya en la caché de principales)
+    queries = int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+    assert queries == 3
@@ -0,0 +1,6 @@
+def test_create_user_and_login(client, login):
+    # login crea el usuario con POST /users/ (bcrypt en el pool de procesos) e inicia sesión
+    headers = login("usuario")
+    response = client.get("/users/me/", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["role"] == "usuario"
@@ -0,0 +1,68 @@
+# Almacén de adjuntos direccionado por contenido.
+# Cada archivo se guarda una sola vez en uploads/blobs/<aa>/<bb>/<sha256>; las filas
+# de Attachment que comparten content_hash actúan como contador de referencias.
+import asyncio
+import os
+import uuid
+import weakref
+from pathlib import Path
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from utils.files import ATTACHMENT_MAX_BYTES, save_upload
+
+UPLOAD_ROOT = Path(os.getenv("UPLOAD_ROOT", "uploads"))
+BLOB_DIR = UPLOAD_ROOT / "blobs"
+TMP_DIR = UPLOAD_ROOT / "tmp"
+
+# Un candado por hash: publicar el blob + insertar la fila, y borrar la fila + contar
+# referencias + borrar el blob, deben ser atómicos entre sí dentro del proceso.
+_blob_locks = weakref.WeakValueDictionary()
+
+
+def blob_path(content_hash: str) -> Path:
+    return BLOB_DIR / content_hash[:2] / content_hash[2:4] / content_hash
+
+def blob_lock(content_hash: str) -> asyncio.Lock:
+    lock = _blob_locks.get(content_hash)
+    if lock is None:
+        lock = asyncio.Lock()
+        _blob_locks[content_hash] = lock
+    return lock
+
+
+async def receive_upload(upload: UploadFile, max_bytes: int = ATTACHMENT_MAX_BYTES):
+    # Guarda la subida en un archivo temporal calculando su hash.
+    # Devuelve (ruta temporal, content_hash, tamaño)
+    await run_in_threadpool(TMP_DIR.mkdir, parents=True, exist_ok=True)
+    tmp_path = TMP_DIR / str(uuid.uuid4())
+    size, content_hash = await save_upload(upload, tmp_path, max_bytes=max_bytes)
+    return tmp_path, content_hash, size
+
+
+def _publish(tmp_path: Path, final_path: Path) -> bool:
+    if final_path.exists():
+        tmp_path.unlink(missing_ok=True)
+        return False
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, final_path)
+    return True
+
+async def publish_blob(tmp_path: Path, content_hash: str) -> Path:
+    # Mueve el temporal a su ruta definitiva, o lo descarta si el contenido ya existía.
+    # Debe llamarse con blob_lock(content_hash) adquirido.
+    final_path = blob_path(content_hash)
+    await run_in_threadpool(_publish, tmp_path, final_path)
+    return final_path
+
+async def discard_upload(tmp_path: Path):
+    await run_in_threadpool(tmp_path.unlink, True)
+
+async def remove_blob(content_hash: str) -> bool:
+    # Debe llamarse con blob_lock(content_hash) adquirido y sin referencias restantes
+    try:
+        await run_in_threadpool(blob_path(content_hash).unlink)
+    except FileNotFoundError:
+        return False
+    return True
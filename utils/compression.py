@@ -0,0 +1,201 @@
+# Compresión de respuestas (gzip y, si está instalado, brotli) negociada con
+# Accept-Encoding. Solo se comprimen tipos de texto por encima de un umbral; los
+# adjuntos, respuestas parciales y el feed SSE pasan sin tocar.
+# PrecompressedPayload guarda junto a una entrada de caché sus cuerpos ya serializados
+# y comprimidos, para no recomprimir respuestas idénticas en cada petición.
+import gzip
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional: sin ella solo se ofrece gzip
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# Calidad de brotli para respuestas dinámicas y para cuerpos que se cachean
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+BROTLI_CACHED_QUALITY = int(os.getenv("COMPRESSION_BROTLI_CACHED_QUALITY", "11"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/csv", "text/html")
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str):
+    # Codificación aceptada con mayor q; en empate se prefiere br
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress(body: bytes, encoding: str, cached: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_CACHED_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=9 if cached else GZIP_LEVEL)
+
+def weak_etag(etag: str) -> str:
+    # Otra representación del mismo recurso: el ETag fuerte deja de ser válido
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+class _StreamCompressor:
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._compress = self._compressor.process
+            self._finish = self._compressor.finish
+        else:
+            # wbits 16 + MAX_WBITS: formato gzip
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = self._compressor.compress
+            self._finish = self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compress(data)
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    # Middleware ASGI puro: no envuelve el cuerpo en memoria salvo el primer bloque,
+    # así las respuestas en streaming (exportación) se comprimen sobre la marcha
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressingResponder:
+
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.active = None
+        self.compressor = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.wrapped_send)
+
+    def _eligible(self, headers: Headers, status: int) -> bool:
+        if status < 200 or status in (204, 206, 304):
+            return False
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return media_type in COMPRESSIBLE_TYPES
+
+    async def wrapped_send(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Se decide con el primer bloque del cuerpo (tamaño y si hay más)
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.active = self._eligible(headers, message["status"])
+            if not self.active:
+                await self.send(message)
+            return
+
+        if not self.active or message_type != "http.response.body":
+            # Incluye http.response.zerocopysend de los adjuntos
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+
+        if self.compressor is None:
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self.minimum_size:
+                # Respuesta completa y pequeña: no compensa comprimir
+                self.active = False
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+            self.compressor = _StreamCompressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            if "etag" in headers:
+                headers["ETag"] = weak_etag(headers["etag"])
+            if "content-length" in headers:
+                del headers["content-length"]
+            if not more_body:
+                compressed = self.compressor.compress(body) + self.compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            await self.send(self.start_message)
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.finish()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+class PrecompressedPayload:
+    # Valor de caché: los objetos cargados y sus cuerpos por codificación. Vive dentro de
+    # la entrada versionada, así los cuerpos nunca sobreviven a un cambio de los datos.
+
+    def __init__(self, items):
+        self.items = items
+        self._bodies = {}
+
+    def body(self, encoding, render) -> bytes:
+        cached = self._bodies.get(encoding)
+        if cached is None:
+            if encoding is None:
+                cached = render(self.items)
+            else:
+                cached = compress(self.body(None, render), encoding, cached=True)
+            self._bodies[encoding] = cached
+        return cached
+
+
+def precompressed_response(request, response: Response, payload: PrecompressedPayload, render) -> Response:
+    # Cuerpo ya comprimido según Accept-Encoding; el middleware no lo vuelve a comprimir
+    headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    body = payload.body(None, render)
+    headers["Vary"] = "Accept-Encoding"
+    if encoding is not None and len(body) >= COMPRESSION_MIN_BYTES:
+        body = payload.body(encoding, render)
+        headers["Content-Encoding"] = encoding
+        if "etag" in headers:
+            headers["etag"] = weak_etag(headers["etag"])
+    return Response(body, media_type="application/json", headers=headers)
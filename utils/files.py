@@ -0,0 +1,198 @@
+import hashlib
+import os
+import stat
+from pathlib import Path
+from urllib.parse import quote
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+
+# Configuración de archivos adjuntos
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(25 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+# Margen para las cabeceras multipart y los campos del formulario junto al archivo
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class InvalidRange(Exception):
+    pass
+
+
+async def save_upload(upload: UploadFile, destination: Path, max_bytes: int = ATTACHMENT_MAX_BYTES):
+    # Copia por bloques sin bloquear el event loop calculando el SHA-256 al vuelo;
+    # si se supera el límite se elimina el archivo parcial y se lanza UploadTooLarge.
+    # Devuelve (tamaño, hash hexadecimal).
+    size = 0
+    digest = hashlib.sha256()
+    buffer = await run_in_threadpool(destination.open, "wb")
+    try:
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge()
+            digest.update(chunk)
+            await run_in_threadpool(buffer.write, chunk)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        await run_in_threadpool(destination.unlink, True)
+        raise
+    await run_in_threadpool(buffer.close)
+    return size, digest.hexdigest()
+
+
+class UploadSizeLimitMiddleware:
+    # Middleware ASGI puro: FastAPI lee y vuelca a disco el formulario multipart completo
+    # antes de ejecutar el endpoint, así que el límite de save_upload llega tarde. Aquí se
+    # rechaza (413) por Content-Length sin leer el cuerpo y, sin Content-Length (chunked),
+    # se corta la lectura en cuanto el cuerpo recibido supera el límite.
+
+    def __init__(self, app, paths=("/attachments/",), max_bytes: int = ATTACHMENT_MAX_BYTES):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_body = max_bytes + UPLOAD_FORM_OVERHEAD_BYTES
+        self.max_bytes = max_bytes
+        self.rejected = 0
+
+    def _too_large(self):
+        self.rejected += 1
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"El archivo supera el tamaño máximo permitido ({self.max_bytes} bytes)"},
+            headers={"Connection": "close"},
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    # La aplicación ve una desconexión; su respuesta se descarta
+                    rejected = True
+                    await self._too_large()(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+
+def parse_range(header: str, file_size: int):
+    # Solo se admite un rango simple: "bytes=inicio-fin", "bytes=inicio-" o "bytes=-sufijo"
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise InvalidRange()
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text == "":
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise InvalidRange()
+            start = max(file_size - suffix, 0)
+            end = file_size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else file_size - 1
+    except ValueError:
+        raise InvalidRange()
+    end = min(end, file_size - 1)
+    if start < 0 or start > end:
+        raise InvalidRange()
+    return start, end
+
+
+def content_disposition(filename: str) -> str:
+    # Como FileResponse de Starlette: nombres con comillas o fuera de ASCII van en la
+    # forma RFC 5987 (filename*=utf-8''...) en lugar de romper la cabecera o el encoding
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+class RangeFileResponse(Response):
+    # Respuesta de archivo con soporte de Range (206) y envío sin copia
+    # (extensión ASGI "http.response.zerocopysend") cuando el servidor la ofrece.
+
+    def __init__(self, path, range_header: str = None, filename: str = None, media_type: str = "application/octet-stream"):
+        self.path = str(path)
+        self.media_type = media_type
+        self.background = None
+        stat_result = os.stat(self.path)
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise FileNotFoundError(self.path)
+        file_size = stat_result.st_size
+
+        self.status_code = 200
+        self.offset = 0
+        self.count = file_size
+        headers = {"accept-ranges": "bytes"}
+        if range_header and file_size > 0:
+            start, end = parse_range(range_header, file_size)
+            self.status_code = 206
+            self.offset = start
+            self.count = end - start + 1
+            headers["content-range"] = f"bytes {start}-{end}/{file_size}"
+        headers["content-length"] = str(self.count)
+        if filename:
+            headers["content-disposition"] = content_disposition(filename)
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope.get("method") == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        file = await run_in_threadpool(open, self.path, "rb")
+        try:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.fileno(),
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+                return
+
+            await run_in_threadpool(file.seek, self.offset)
+            remaining = self.count
+            while remaining > 0:
+                chunk = await run_in_threadpool(file.read, min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await run_in_threadpool(file.close)
@@ -0,0 +1,197 @@
+# Control de admisión en proceso:
+#   - TokenBucketLimiter: cubo de fichas por clave (IP, usuario, email del login). Cada
+#     petición consume una ficha; las fichas se reponen a ritmo constante hasta la ráfaga.
+#     Sin fichas se responde 429 con Retry-After (el tiempo hasta la siguiente ficha).
+#   - AdmissionMiddleware: descarta peticiones (429) cuando hay demasiadas en curso, antes
+#     de que consuman CPU o conexiones a la base de datos.
+# Los límites de cada ruta se declaran en main.py; aquí solo está el mecanismo y sus contadores.
+import math
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from starlette.responses import JSONResponse
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Claves distintas recordadas por limitador; se olvidan primero las menos usadas
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Usar X-Forwarded-For solo si la API está detrás de un proxy de confianza
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
+# Peticiones en curso a partir de las cuales se descarta carga (0 = sin límite)
+ADMISSION_MAX_PENDING = int(os.getenv("ADMISSION_MAX_PENDING", "256"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+class RateLimitExceeded(Exception):
+
+    def __init__(self, limiter: str, retry_after: float):
+        super().__init__(limiter)
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+def parse_limit(spec: str):
+    # "20/minute" -> (ráfaga 20, 20/60 fichas por segundo); "5/minute:10" fija la ráfaga
+    amount, _, rest = spec.partition("/")
+    period, _, burst = rest.partition(":")
+    count = int(amount)
+    rate = count / PERIODS[period.strip()]
+    return (int(burst) if burst else count), rate
+
+
+class TokenBucketLimiter:
+
+    def __init__(self, name: str, spec: str, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        # La variable RATE_LIMIT_<NOMBRE> sustituye al límite declarado en la ruta
+        self.name = name
+        self.spec = os.getenv(f"RATE_LIMIT_{name.upper()}", spec)
+        self.burst, self.rate = parse_limit(self.spec)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+        self.allowed = 0
+        self.rejected = 0
+        self.evictions = 0
+        rate_limit_registry.register(self)
+
+    def hit(self, key: str):
+        if not RATE_LIMIT_ENABLED or key is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = float(self.burst)
+            else:
+                tokens, updated = bucket
+                tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+                self.rejected += 1
+                raise RateLimitExceeded(self.name, (1.0 - tokens) / self.rate)
+            self._buckets[key] = (tokens - 1.0, now)
+            self._buckets.move_to_end(key)
+            self.allowed += 1
+            # Un cubo olvidado equivale a uno lleno: se sacrifican los más antiguos
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limit": self.spec,
+                "burst": self.burst,
+                "rate_per_second": self.rate,
+                "keys": len(self._buckets),
+                "max_keys": self.max_keys,
+                "allowed": self.allowed,
+                "rejected": self.rejected,
+                "evictions": self.evictions,
+            }
+
+
+def client_ip(request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class AdmissionMiddleware:
+    # Middleware ASGI puro: cuenta las peticiones HTTP en curso y rechaza las nuevas
+    # por encima de max_pending. Las rutas exentas (métricas, SSE de larga duración)
+    # no ocupan plaza ni se rechazan.
+
+    def __init__(self, app, max_pending: int = ADMISSION_MAX_PENDING, exempt_paths=("/metrics", "/events/stream")):
+        self.app = app
+        self.max_pending = max_pending
+        self.exempt_paths = frozenset(exempt_paths)
+        self.in_flight = 0
+        self.peak = 0
+        self.admitted = 0
+        self.shed = 0
+        rate_limit_registry.admission = self
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths or self.max_pending <= 0:
+            await self.app(scope, receive, send)
+            return
+        if self.in_flight >= self.max_pending:
+            self.shed += 1
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Servidor saturado, intente de nuevo en unos segundos"},
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        self.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "peak": self.peak,
+            "max_pending": self.max_pending,
+            "admitted": self.admitted,
+            "shed": self.shed,
+        }
+
+
+class RateLimitRegistry:
+
+    def __init__(self):
+        self.limiters = {}
+        self.admission = None
+
+    def register(self, limiter: TokenBucketLimiter):
+        self.limiters[limiter.name] = limiter
+
+    def stats(self):
+        return {
+            "enabled": RATE_LIMIT_ENABLED,
+            "limiters": {name: limiter.stats() for name, limiter in sorted(self.limiters.items())},
+            "admission": self.admission.stats() if self.admission is not None else None,
+        }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP rate_limit_allowed_total Peticiones admitidas por limitador",
+            "# TYPE rate_limit_allowed_total counter",
+        ]
+        stats = {name: limiter.stats() for name, limiter in sorted(self.limiters.items())}
+        lines += [f'rate_limit_allowed_total{{limiter="{name}"}} {entry["allowed"]}' for name, entry in stats.items()]
+        lines += [
+            "# HELP rate_limit_rejected_total Peticiones rechazadas con 429 por limitador",
+            "# TYPE rate_limit_rejected_total counter",
+        ]
+        lines += [f'rate_limit_rejected_total{{limiter="{name}"}} {entry["rejected"]}' for name, entry in stats.items()]
+        if self.admission is not None:
+            admission = self.admission.stats()
+            lines += [
+                "# HELP admission_in_flight Peticiones en curso",
+                "# TYPE admission_in_flight gauge",
+                f"admission_in_flight {admission['in_flight']}",
+                "# HELP admission_shed_total Peticiones descartadas por saturación",
+                "# TYPE admission_shed_total counter",
+                f"admission_shed_total {admission['shed']}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+rate_limit_registry = RateLimitRegistry()
@@ -0,0 +1,73 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
+
+from passlib.context import CryptContext
+
+# Configuración para el hash de contraseñas
+# BCRYPT_ROUNDS se puede ajustar con scripts/calibrate_bcrypt.py
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(os.cpu_count() or 2)))
+# Número máximo de operaciones bcrypt en curso o en cola antes de rechazar nuevas
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", str(PASSWORD_POOL_WORKERS * 8)))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+# Funciones ejecutadas dentro de los procesos del pool (deben ser de nivel de módulo)
+def _hash_password(password: str, rounds: int) -> str:
+    # CryptContext.using solo acepta opciones con prefijo de esquema (bcrypt__rounds)
+    return pwd_context.using(bcrypt__rounds=rounds).hash(password)
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+_executor = None
+_executor_lock = Lock()
+_pending = 0
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS)
+        return _executor
+
+async def _submit(func, *args):
+    global _pending
+    # Control de profundidad de cola: rechazar en lugar de acumular trabajo
+    if _pending >= PASSWORD_POOL_MAX_PENDING:
+        raise PasswordHasherBusy()
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _submit(_hash_password, password, BCRYPT_ROUNDS)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _submit(_verify_password, plain_password, hashed_password)
+
+def password_pool_stats():
+    return {
+        "workers": PASSWORD_POOL_WORKERS,
+        "pending": _pending,
+        "max_pending": PASSWORD_POOL_MAX_PENDING,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+    }
+
+def shutdown_password_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
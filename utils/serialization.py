@@ -0,0 +1,135 @@
+# Ruta rápida de serialización JSON para respuestas de listas.
+# FastAPI valida cada objeto ORM contra el response_model, lo convierte con
+# jsonable_encoder y lo serializa con json.dumps. Para páginas de 100 tickets con sus
+# comentarios ese trabajo domina la CPU de la petición. Aquí:
+#   - los serializadores se compilan una vez por esquema (campos y anidados resueltos),
+#   - por defecto se valida con un TypeAdapter cacheado y pydantic-core escribe el JSON
+#     (mismo resultado que response_model, sin jsonable_encoder ni json.dumps),
+#   - con FAST_JSON_TRUSTED=true la salida del ORM se da por válida y se copian solo los
+#     atributos declarados en el esquema, sin volver a validarla; un atributo obligatorio
+#     que el objeto no tenga es un error, nunca un null,
+#   - orjson serializa datetime y UUID de forma nativa.
+# También genera los bloques NDJSON/CSV de la exportación de tickets.
+import csv
+import io
+import os
+import typing
+from datetime import datetime
+from functools import lru_cache
+from typing import List
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+
+FAST_JSON_TRUSTED = os.getenv("FAST_JSON_TRUSTED", "false").lower() in ("1", "true", "yes")
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+_MISSING = object()
+
+
+class MissingSchemaAttribute(AttributeError):
+    pass
+
+
+class ORJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def _nested_model(annotation):
+    # (modelo anidado, es_lista) para Model, Optional[Model] y List[Model]
+    origin = typing.get_origin(annotation)
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    if origin in (list, List) and args:
+        model, _ = _nested_model(args[0])
+        return model, True
+    if origin is typing.Union and len(args) == 1:
+        return _nested_model(args[0])
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(schema: type):
+    # Objeto ORM -> dict con los campos del esquema; los anidados usan su propio
+    # serializador compilado. Un atributo opcional ausente toma el valor por defecto del
+    # campo; uno obligatorio ausente lanza MissingSchemaAttribute.
+    fields = []
+    for name, field in schema.model_fields.items():
+        nested, many = _nested_model(field.annotation)
+        default = _MISSING if field.is_required() else field.get_default(call_default_factory=True)
+        key = field.serialization_alias or field.alias or name
+        fields.append((key, name, default, compile_serializer(nested) if nested else None, many))
+
+    def serialize(obj):
+        data = {}
+        for key, name, default, nested, many in fields:
+            value = getattr(obj, name, default)
+            if value is _MISSING:
+                raise MissingSchemaAttribute(
+                    f"{type(obj).__name__} no tiene el atributo '{name}' obligatorio en {schema.__name__}"
+                )
+            if nested is not None and value is not None:
+                value = [nested(item) for item in value] if many else nested(value)
+            data[key] = value
+        return data
+
+    return serialize
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: type) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+
+def dump_list(schema: type, items) -> bytes:
+    if FAST_JSON_TRUSTED:
+        serialize = compile_serializer(schema)
+        return orjson.dumps([serialize(item) for item in items], option=ORJSON_OPTIONS)
+    adapter = _list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+
+def list_response(schema: type, items, response: Response = None) -> Response:
+    # Las cabeceras puestas en el parámetro response (ETag, X-Next-Cursor) no se aplican
+    # cuando el endpoint devuelve su propia Response: se copian aquí
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return Response(dump_list(schema, items), media_type="application/json", headers=headers)
+
+
+# --- Exportación por streaming -------------------------------------------------
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+async def ndjson_chunks(rows):
+    # Una línea JSON por fila; se agrupan en bloques para no enviar un mensaje por fila
+    buffer = bytearray()
+    async for row in rows:
+        buffer += orjson.dumps(dict(row._mapping), option=ORJSON_OPTIONS)
+        buffer += b"\n"
+        if len(buffer) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def csv_chunks(rows, columns):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    async for row in rows:
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        if output.tell() >= EXPORT_CHUNK_BYTES:
+            yield output.getvalue().encode("utf-8")
+            output.seek(0)
+            output.truncate()
+    if output.tell():
+        yield output.getvalue().encode("utf-8")